@@ -0,0 +1,192 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from mongo import get_db
+from price_records import PriceRecords
+from sections import MARKETS
+
+# (label, base market, compared market): the spread is how much the compared
+# market's price is above the base market's, in percent of the base price
+SPREADS = [
+    ('Dambulla vs Pettah wholesale', 'pettah_wholesale', 'dambulla_wholesale'),
+    ('Dambulla vs Pettah retail', 'pettah_retail', 'dambulla_retail'),
+    ('Pettah retail markup', 'pettah_wholesale', 'pettah_retail'),
+    ('Dambulla retail markup', 'dambulla_wholesale', 'dambulla_retail'),
+    ('Negombo retail markup', 'negombo_wholesale', 'negombo_retail')
+]
+
+# Movers listed per type and per market
+TOP_MOVERS = 3
+
+def add_records(columns, date, records):
+    """Append the rows of PriceRecords to price_frame's columns, in the same order as item dicts"""
+    # (market, yesterday column) pairs of every type, in MARKETS order
+    layouts = [
+        [(market, 2 * markets.index(market)) for market in MARKETS if market in markets]
+        for _, markets in records.types
+    ]
+    for code, name, values in zip(records.type_codes.tolist(), records.names, records.prices.tolist()):
+        item_type = records.types[code][0]
+        for market, column in layouts[code]:
+            columns['date'].append(date)
+            columns['type'].append(item_type)
+            columns['item'].append(name)
+            columns['market'].append(market)
+            columns['yesterday'].append(values[column])
+            columns['today'].append(values[column + 1])
+
+def price_frame(docs):
+    """
+    Flatten day documents ({'date', 'types'} or {'date', 'data'}, where data
+    is a list of item dicts or PriceRecords) into one
+    row per date, item and market with numeric yesterday and today prices.
+    Missing prices ('N/A') become NaN.
+    """
+    columns = {'date': [], 'type': [], 'item': [], 'market': [], 'yesterday': [], 'today': []}
+    for doc in docs:
+        if isinstance(doc.get('data'), PriceRecords):
+            add_records(columns, doc['date'], doc['data'])
+            continue
+        if 'types' in doc:
+            items = [item for group in doc['types'] for item in group['items']]
+        else:
+            items = doc.get('data', [])
+        for item in items:
+            for market in MARKETS:
+                prices = item.get(market)
+                if not prices:
+                    continue
+                columns['date'].append(doc['date'])
+                columns['type'].append(item['type'])
+                columns['item'].append(item['item'])
+                columns['market'].append(market)
+                columns['yesterday'].append(prices.get('yesterday'))
+                columns['today'].append(prices.get('today'))
+
+    frame = pd.DataFrame(columns)
+    frame['yesterday'] = pd.to_numeric(frame['yesterday'], errors='coerce')
+    frame['today'] = pd.to_numeric(frame['today'], errors='coerce')
+    # Same rule as report_render.calc_change: undefined when yesterday is missing or zero
+    yesterday = frame['yesterday'].to_numpy(dtype=float)
+    today = frame['today'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame['change'] = np.where(yesterday != 0, (today - yesterday) / yesterday * 100, np.nan)
+    return frame
+
+def top_movers(frame, by, count=TOP_MOVERS):
+    """The count largest absolute changes for every date and value of `by` ('type' or 'market')"""
+    moved = frame[frame['change'].notna() & (frame['change'] != 0)]
+    moved = moved.assign(magnitude=moved['change'].abs())
+    moved = moved.sort_values(['date', by, 'magnitude'], ascending=[True, True, False], kind='stable')
+    return moved.groupby(['date', by], sort=False).head(count).drop(columns='magnitude')
+
+def market_spreads(frame):
+    """
+    Spread statistics for every date, type and SPREADS entry:
+    mean, min and max percentage over the items priced in both markets.
+    """
+    if frame.empty:
+        return pd.DataFrame(columns=['date', 'type', 'spread', 'mean', 'min', 'max', 'count'])
+    wide = (frame.drop_duplicates(['date', 'type', 'item', 'market'])
+            .set_index(['date', 'type', 'item', 'market'])['today']
+            .unstack('market'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spreads = pd.DataFrame({
+            label: (wide[compared] - wide[base]) / wide[base] * 100
+            for label, base, compared in SPREADS
+            if base in wide.columns and compared in wide.columns
+        }, index=wide.index)
+
+    values = (spreads.reset_index()
+              .melt(id_vars=['date', 'type', 'item'], var_name='spread', value_name='value')
+              .replace([np.inf, -np.inf], np.nan)
+              .dropna(subset=['value']))
+    stats = values.groupby(['date', 'type', 'spread'], sort=False)['value'].agg(['mean', 'min', 'max', 'count'])
+    return stats.reset_index().sort_values(['date', 'type'], kind='stable')
+
+def analyze(docs):
+    """Return {'by_type', 'by_market', 'spreads'} frames for the given day documents"""
+    frame = price_frame(docs)
+    return {
+        'by_type': top_movers(frame, 'type'),
+        'by_market': top_movers(frame, 'market'),
+        'spreads': market_spreads(frame)
+    }
+
+def report_sections(docs):
+    """
+    Analytics of day documents in the plain form report_render expects, by date:
+    {date: {'movers_by_type': [(type, rows)], 'movers_by_market': [(market, rows)],
+            'spreads': [(type, label, mean, min, max, items)]}}
+    where each mover row is (item, type, market, yesterday, today, change).
+    All documents are analysed together, so pass many dates at once.
+    """
+    docs = list(docs)
+    frame = price_frame(docs)
+    # Types keep their report order, markets the order of MARKETS
+    type_order = {item_type: position for position, item_type in enumerate(pd.unique(frame['type']))}
+    sections = {doc['date']: {'movers_by_type': [], 'movers_by_market': [], 'spreads': []} for doc in docs}
+
+    for key, by, order in (('movers_by_type', 'type', type_order.get),
+                           ('movers_by_market', 'market', MARKETS.index)):
+        grouped = {}
+        for row in top_movers(frame, by).itertuples(index=False):
+            grouped.setdefault((row.date, getattr(row, by)), []).append(
+                (row.item, row.type, row.market, row.yesterday, row.today, row.change))
+        for (date, group), rows in sorted(grouped.items(), key=lambda pair: order(pair[0][1])):
+            sections[date][key].append((group, rows))
+
+    spreads = market_spreads(frame)
+    for row in spreads.itertuples(index=False):
+        sections[row.date]['spreads'].append(
+            (row.type, row.spread, row.mean, row.min, row.max, int(row.count)))
+    for date_sections in sections.values():
+        date_sections['spreads'].sort(key=lambda spread: type_order.get(spread[0]))
+    return sections
+
+def average_prices(database, start=None, end=None):
+    """
+    Average today price per item and market between two dates, computed by
+    the server. Only numeric prices count (see migrate_numeric_prices.py).
+    """
+    match = {}
+    if start or end:
+        match['date'] = {**({'$gte': start} if start else {}), **({'$lte': end} if end else {})}
+    pipeline = [{'$match': match}] if match else []
+    pipeline += [
+        {'$unwind': '$data'},
+        {'$group': {
+            '_id': {'type': '$data.type', 'item': '$data.item'},
+            **{market: {'$avg': f'$data.{market}.today'} for market in MARKETS}
+        }},
+        {'$sort': {'_id.type': 1, '_id.item': 1}}
+    ]
+    rows = [{'type': doc['_id']['type'], 'item': doc['_id']['item'],
+             **{market: doc.get(market) for market in MARKETS}}
+            for doc in database['row_data'].aggregate(pipeline)]
+    return pd.DataFrame(rows, columns=['type', 'item'] + MARKETS)
+
+def export(database, output_prefix):
+    """Analyse every date in row_data and write the results as CSV files"""
+    docs = database['row_data'].find({}, {'_id': 0, 'date': 1, 'data': 1})
+    results = analyze(docs)
+    for name, frame in results.items():
+        path = f"{output_prefix}_{name}.csv"
+        frame.to_csv(path, index=False)
+        print(f"Wrote {len(frame)} rows to {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Top movers and market spreads over all of row_data')
+    parser.add_argument('--output-prefix', default='reports/analytics',
+                        help='prefix of the CSV files written (default: reports/analytics)')
+    parser.add_argument('--averages', action='store_true',
+                        help='also write the server-side average price of every item and market')
+    args = parser.parse_args()
+    export(get_db(), args.output_prefix)
+    if args.averages:
+        averages = average_prices(get_db())
+        path = f"{args.output_prefix}_averages.csv"
+        averages.to_csv(path, index=False)
+        print(f"Wrote {len(averages)} rows to {path}")
@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_extractor
+import price_records
+from indexes import setup_indexes
+from mongo import get_client, get_db, new_async_client
+
+# Items each stage may hold before the stage feeding it has to wait
+QUEUE_SIZE = 8
+
+# Marks the end of a queue's input
+DONE = None
+
+async def discover(pdf_paths, parse_queue, parsers):
+    """Feed the PDF paths to the parsers, then tell each of them to stop"""
+    for pdf_path in pdf_paths:
+        await parse_queue.put(pdf_path)
+    for _ in range(parsers):
+        await parse_queue.put(DONE)
+
+async def parse(executor, parse_queue, write_queue, use_cache):
+    """Parse PDFs in the process pool and pass the results on to the writer"""
+    loop = asyncio.get_running_loop()
+    while True:
+        pdf_path = await parse_queue.get()
+        if pdf_path is DONE:
+            return
+        result = await loop.run_in_executor(executor, partial(pdf_extractor.parse_pdf, pdf_path, use_cache))
+        await write_queue.put(result)
+
+async def flush(collection, operations, pdf_paths, documents, move_queue):
+    """
+    Store one batch with pdf_extractor.store_batch and queue its PDFs for
+    moving. The batch is handled in a thread, which hands the bulk write and
+    the queued moves back to the event loop. Returns False if the batch was
+    not stored.
+    """
+    loop = asyncio.get_running_loop()
+
+    def write(operations):
+        return asyncio.run_coroutine_threadsafe(collection.bulk_write(operations, ordered=False), loop).result()
+
+    def move(pdf_paths):
+        for pdf_path in pdf_paths:
+            asyncio.run_coroutine_threadsafe(move_queue.put(pdf_path), loop).result()
+
+    error = await asyncio.to_thread(pdf_extractor.store_batch, write, operations, pdf_paths, documents, move)
+    if error:
+        print(f"{error}, leaving {len(pdf_paths)} PDFs for the next run")
+        return False
+    return True
+
+async def write(collection, write_queue, move_queue, parsers, batch_size, flush_interval):
+    """
+    Batch the parsed documents into unordered bulk writes, flushing every
+    batch_size operations or flush_interval seconds after the first PDF of
+    a partial batch arrived. Returns the paths whose batch was not stored.
+    """
+    operations = []
+    batch_paths = []
+    batch_documents = []
+    failed_paths = []
+    batch_started = None
+    running = parsers
+
+    # The pending get outlives a timed-out wait instead of being cancelled,
+    # so an item dequeued just as the interval runs out is never lost
+    get_task = None
+    try:
+        while running:
+            if get_task is None:
+                get_task = asyncio.ensure_future(write_queue.get())
+            timeout = max(0.0, batch_started + flush_interval - time.monotonic()) if batch_paths else None
+            finished, _ = await asyncio.wait({get_task}, timeout=timeout)
+
+            if get_task in finished:
+                item = get_task.result()
+                get_task = None
+                if item is DONE:
+                    running -= 1
+                else:
+                    pdf_path, extracted_data = item
+                    if extracted_data:
+                        if not batch_paths:
+                            batch_started = time.monotonic()
+                        operations.extend(pdf_extractor.build_upserts(extracted_data))
+                        batch_paths.append(pdf_path)
+                        batch_documents.extend(extracted_data)
+                    else:
+                        print(f"Failed to process {os.path.basename(pdf_path)}")
+
+            if batch_paths and (len(operations) >= batch_size or
+                                time.monotonic() - batch_started >= flush_interval):
+                if not await flush(collection, operations, batch_paths, batch_documents, move_queue):
+                    failed_paths.extend(batch_paths)
+                operations = []
+                batch_paths = []
+                batch_documents = []
+    finally:
+        if get_task is not None:
+            get_task.cancel()
+
+    if batch_paths:
+        if not await flush(collection, operations, batch_paths, batch_documents, move_queue):
+            failed_paths.extend(batch_paths)
+    await move_queue.put(DONE)
+    return failed_paths
+
+async def move(move_queue):
+    """Move stored PDFs to the processed folder"""
+    while True:
+        pdf_path = await move_queue.get()
+        if pdf_path is DONE:
+            return
+        await asyncio.to_thread(pdf_extractor.move_to_processed, pdf_path)
+        filename = os.path.basename(pdf_path)
+        print(f"Successfully processed and stored data from {filename}")
+        print(f"Moved {filename} to processed folder")
+
+async def run_pipeline(pdf_paths, collection, workers=2, use_cache=True,
+                       batch_size=pdf_extractor.BATCH_SIZE, flush_interval=pdf_extractor.FLUSH_INTERVAL):
+    """
+    Parse, store and move pdf_paths with the stages running concurrently.
+    Bounded queues between the stages keep at most a few parsed PDFs in memory.
+    Returns the paths that could not be stored.
+    """
+    parse_queue = asyncio.Queue(QUEUE_SIZE)
+    write_queue = asyncio.Queue(QUEUE_SIZE)
+    move_queue = asyncio.Queue(QUEUE_SIZE)
+
+    # The parsers finish by putting DONE on the write queue for the writer to count
+    async def parser(executor):
+        await parse(executor, parse_queue, write_queue, use_cache)
+        await write_queue.put(DONE)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = await asyncio.gather(
+            discover(pdf_paths, parse_queue, workers),
+            *(parser(executor) for _ in range(workers)),
+            write(collection, write_queue, move_queue, workers, batch_size, flush_interval),
+            move(move_queue)
+        )
+    # The writer's result comes after discover's and the parsers'
+    return results[workers + 1]
+
+async def main(workers=2, use_cache=True, batch_size=pdf_extractor.BATCH_SIZE,
+               flush_interval=pdf_extractor.FLUSH_INTERVAL):
+    os.makedirs('reports', exist_ok=True)
+    os.makedirs('data/processed', exist_ok=True)
+
+    # Make sure the upserts hit an index and use the price form the database stores
+    await asyncio.to_thread(setup_indexes, get_client(), ['central_bank'])
+    await asyncio.to_thread(price_records.load_price_values, get_db())
+
+    pdf_dir = 'data'
+    pdf_paths = [os.path.join(pdf_dir, filename) for filename in pdf_extractor.find_pdf_files(pdf_dir)]
+
+    client = new_async_client()
+    try:
+        failed_paths = await run_pipeline(pdf_paths, client['central_bank']['row_data'], workers, use_cache,
+                                          batch_size, flush_interval)
+    finally:
+        await client.close()
+    if failed_paths:
+        print(f"{len(failed_paths)} PDFs could not be stored and were left in {pdf_dir}")
+    return failed_paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Extract the PDFs in data/ with parsing and Mongo writes overlapped')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='number of processes used to parse PDFs (default: 2)')
+    parser.add_argument('--no-table-cache', action='store_true',
+                        help='always re-run table extraction instead of using cached tables')
+    parser.add_argument('--batch-size', type=int, default=pdf_extractor.BATCH_SIZE,
+                        help=f'upserts per bulk write (default: {pdf_extractor.BATCH_SIZE})')
+    parser.add_argument('--flush-interval', type=float, default=pdf_extractor.FLUSH_INTERVAL,
+                        help=f'seconds before a partial batch is flushed (default: {pdf_extractor.FLUSH_INTERVAL})')
+    args = parser.parse_args()
+    failed_paths = asyncio.run(main(workers=args.workers, use_cache=not args.no_table_cache,
+                                    batch_size=args.batch_size, flush_interval=args.flush_interval))
+    sys.exit(1 if failed_paths else 0)
@@ -0,0 +1,239 @@
+import os
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+from functools import partial
+
+import pdf_extractor
+import price_records
+from indexes import setup_indexes
+from mongo import get_client, get_db
+
+# Durable record of every PDF a backfill has seen and how far it got
+LEDGER_PATH = 'data/backfill.sqlite'
+
+# A file moves through these in order; 'failed' files are retried on the next run.
+# 'written' is only recorded once the batch is in Mongo, in the price cube and
+# announced by the ingest marker, so a resumed run just has to move the file.
+PENDING = 'pending'
+PARSED = 'parsed'
+WRITTEN = 'written'
+MOVED = 'moved'
+FAILED = 'failed'
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 10.0
+
+def open_ledger(path=LEDGER_PATH):
+    """Open (and create if needed) the backfill ledger"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    ledger = sqlite3.connect(path)
+    ledger.execute("PRAGMA journal_mode=WAL")
+    ledger.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            documents INTEGER,
+            error TEXT,
+            updated REAL NOT NULL
+        )
+    """)
+    return ledger
+
+def set_status(ledger, pdf_paths, status, documents=None, error=None):
+    """Record the status of some files and commit it"""
+    now = time.time()
+    with ledger:
+        ledger.executemany(
+            "UPDATE files SET status = ?, documents = COALESCE(?, documents), error = ?, updated = ? "
+            "WHERE path = ?",
+            [(status, documents, error, now, pdf_path) for pdf_path in pdf_paths]
+        )
+
+def find_backfill_pdfs(directory, start=None, end=None):
+    """
+    List the dated PDFs in directory whose date lies in [start, end].
+    Returns (pdf_path, date) pairs sorted by date.
+    """
+    found = []
+    for filename in pdf_extractor.find_pdf_files(directory):
+        pdf_path = os.path.join(directory, filename)
+        try:
+            date_obj = pdf_extractor.date_from_filename(pdf_path)
+        except ValueError:
+            print(f"Skipping {filename}: name is not a YYYY-MM-DD date")
+            continue
+        if (start and date_obj < start) or (end and date_obj > end):
+            continue
+        found.append((pdf_path, date_obj))
+    return sorted(found, key=lambda pair: pair[1])
+
+def register(ledger, pdfs):
+    """
+    Add files the ledger has not seen yet as pending. A moved file that is
+    back in the input directory is a re-issued PDF, so it is pending again.
+    """
+    now = time.time()
+    with ledger:
+        ledger.executemany(
+            "INSERT OR IGNORE INTO files (path, date, status, updated) VALUES (?, ?, ?, ?)",
+            [(pdf_path, date_obj.strftime('%Y-%m-%d'), PENDING, now) for pdf_path, date_obj in pdfs]
+        )
+        reissued = ledger.executemany(
+            "UPDATE files SET status = ?, error = NULL, updated = ? WHERE path = ? AND status = ?",
+            [(PENDING, now, pdf_path, MOVED) for pdf_path, _ in pdfs]
+        ).rowcount
+    if reissued > 0:
+        print(f"{reissued} moved PDFs are back in the input directory and will be ingested again")
+
+def statuses(ledger, pdf_paths):
+    """Return {path: status} for pdf_paths"""
+    result = {}
+    for pdf_path, status in ledger.execute("SELECT path, status FROM files"):
+        result[pdf_path] = status
+    return {pdf_path: result.get(pdf_path, PENDING) for pdf_path in pdf_paths}
+
+def move_written(ledger, pdf_paths):
+    """Move stored PDFs to the processed folder and record it"""
+    for pdf_path in pdf_paths:
+        pdf_dir, filename = os.path.split(pdf_path)
+        if os.path.exists(pdf_path):
+            pdf_extractor.move_to_processed(pdf_path)
+        elif not os.path.exists(os.path.join(pdf_dir, 'processed', filename)):
+            # Gone from both places; leave it as written so it shows up in the ledger
+            print(f"Warning: {filename} is missing, cannot move it")
+            continue
+        set_status(ledger, [pdf_path], MOVED)
+
+class Progress:
+    """Prints files done, rate and ETA at most every PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, total, done=0, interval=PROGRESS_INTERVAL):
+        self.total = total
+        self.done = done
+        self.start_done = done
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_print = 0.0
+
+    def advance(self, count, force=False):
+        self.done += count
+        now = time.monotonic()
+        if not force and now - self.last_print < self.interval:
+            return
+        self.last_print = now
+
+        elapsed = now - self.started
+        rate = (self.done - self.start_done) / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        if remaining <= 0:
+            eta = '00:00:00'
+        elif rate > 0:
+            eta = time.strftime('%H:%M:%S', time.gmtime(remaining / rate))
+        else:
+            eta = 'unknown'
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+        print(f"Backfill: {self.done}/{self.total} files ({percent:.1f}%), "
+              f"{rate:.2f} files/s, ETA {eta}")
+
+def write_batch(ledger, collection, operations, pdf_paths, documents):
+    """
+    Store one batch and move its PDFs, recording each step in the ledger.
+    Returns False, with the batch's files marked failed, if the batch was not stored.
+    """
+    # Called by store_batch after the cube append and the marker bump
+    def move(pdf_paths):
+        set_status(ledger, pdf_paths, WRITTEN)
+        move_written(ledger, pdf_paths)
+
+    error = pdf_extractor.store_batch(partial(collection.bulk_write, ordered=False),
+                                      operations, pdf_paths, documents, move)
+    if error:
+        # The upserts are idempotent, so the whole batch is simply retried next run
+        print(f"{error}, {len(pdf_paths)} PDFs marked failed")
+        set_status(ledger, pdf_paths, FAILED, error=error)
+        return False
+    return True
+
+def backfill(directory, start=None, end=None, workers=1, use_cache=True,
+             batch_size=pdf_extractor.BATCH_SIZE, ledger_path=LEDGER_PATH, collection=None):
+    """
+    Ingest every dated PDF in directory within [start, end], resuming from
+    the ledger: moved files are skipped, written files are only moved and
+    everything else is parsed and written again.
+    """
+    collection = get_db()['row_data'] if collection is None else collection
+    os.makedirs(os.path.join(directory, 'processed'), exist_ok=True)
+    ledger = open_ledger(ledger_path)
+    try:
+        pdfs = find_backfill_pdfs(directory, start, end)
+        register(ledger, pdfs)
+        status_by_path = statuses(ledger, [pdf_path for pdf_path, _ in pdfs])
+
+        written = [pdf_path for pdf_path, status in status_by_path.items() if status == WRITTEN]
+        todo = [pdf_path for pdf_path, status in status_by_path.items() if status not in (WRITTEN, MOVED)]
+        done = len(pdfs) - len(todo) - len(written)
+        print(f"Backfill of {directory}: {len(pdfs)} files, {done} already done, "
+              f"{len(written)} to move, {len(todo)} to ingest")
+
+        # Files whose batch was acknowledged before the last run stopped
+        move_written(ledger, written)
+        progress = Progress(len(pdfs), done + len(written))
+
+        operations = []
+        batch_paths = []
+        batch_documents = []
+        for pdf_path, extracted_data in pdf_extractor.iter_parsed_pdfs(todo, workers, use_cache):
+            if not extracted_data:
+                set_status(ledger, [pdf_path], FAILED, error='no table extracted')
+                progress.advance(1)
+                continue
+
+            set_status(ledger, [pdf_path], PARSED, documents=len(extracted_data))
+            operations.extend(pdf_extractor.build_upserts(extracted_data))
+            batch_paths.append(pdf_path)
+            batch_documents.extend(extracted_data)
+
+            if len(operations) >= batch_size:
+                write_batch(ledger, collection, operations, batch_paths, batch_documents)
+                progress.advance(len(batch_paths))
+                operations = []
+                batch_paths = []
+                batch_documents = []
+
+        if batch_paths:
+            write_batch(ledger, collection, operations, batch_paths, batch_documents)
+            progress.advance(len(batch_paths))
+        progress.advance(0, force=True)
+
+        counts = dict(ledger.execute("SELECT status, COUNT(*) FROM files GROUP BY status"))
+        print("Ledger: " + ', '.join(f"{status} {count}" for status, count in sorted(counts.items())))
+    finally:
+        ledger.close()
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill archived price PDFs with a resumable ledger')
+    parser.add_argument('directory', nargs='?', default='data',
+                        help='directory holding the YYYY-MM-DD.pdf files (default: data)')
+    parser.add_argument('--start', type=parse_date, help='first date to ingest (YYYY-MM-DD)')
+    parser.add_argument('--end', type=parse_date, help='last date to ingest (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes used to parse PDFs (default: 1)')
+    parser.add_argument('--no-table-cache', action='store_true',
+                        help='always re-run table extraction instead of using cached tables')
+    parser.add_argument('--batch-size', type=int, default=pdf_extractor.BATCH_SIZE,
+                        help=f'upserts per bulk write (default: {pdf_extractor.BATCH_SIZE})')
+    parser.add_argument('--ledger', default=LEDGER_PATH,
+                        help=f'path of the ledger database (default: {LEDGER_PATH})')
+    args = parser.parse_args()
+
+    # Make sure the upserts hit an index and use the price form the database stores
+    setup_indexes(get_client(), ['central_bank'])
+    price_records.load_price_values(get_db())
+    backfill(args.directory, args.start, args.end, args.workers, not args.no_table_cache,
+             args.batch_size, args.ledger)
@@ -0,0 +1,229 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+import pdfplumber
+from pymongo import MongoClient
+
+import pdf_extractor
+import generate_report
+import page_locator
+from mongo import client_options
+
+# Stages timed for every PDF, in pipeline order
+STAGES = [
+    'open',
+    'extract_table',
+    'process_table_data',
+    'build_documents',
+    'mongo_write',
+    'generate_single_report'
+]
+
+class MemoryResult:
+    """The counters of a pymongo write result"""
+
+    def __init__(self):
+        self.acknowledged = True
+        self.matched_count = 0
+        self.modified_count = 0
+        self.upserted_count = 0
+
+class MemoryCollection:
+    """
+    In-process stand-in for the collections written by the ingest and report
+    writers. It takes the (filter, update) pairs the writers build their
+    UpdateOne upserts from, so only building the UpdateOne objects is left
+    out of the in-memory timings.
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def upsert(self, pairs):
+        result = MemoryResult()
+        for query, update in pairs:
+            self._upsert(query, update, result)
+        return result
+
+    def _upsert(self, query, update, result):
+        key = tuple(sorted((field, repr(value)) for field, value in query.items()))
+        document = self.documents.get(key)
+        if document is None:
+            document = dict(query)
+            self.documents[key] = document
+            result.upserted_count += 1
+        else:
+            result.matched_count += 1
+            result.modified_count += 1
+
+        for field, value in update.get('$set', {}).items():
+            # Dotted paths set nested fields like Mongo does
+            target = document
+            *parents, leaf = field.split('.')
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+
+class MemoryDatabase(dict):
+    """Creates collections on first access like a pymongo Database"""
+
+    def __missing__(self, name):
+        collection = MemoryCollection()
+        self[name] = collection
+        return collection
+
+def store_documents(documents, database):
+    """The ingest write of one PDF's section documents"""
+    if isinstance(database, MemoryDatabase):
+        return database['row_data'].upsert(pdf_extractor.upsert_pairs(documents))
+    return pdf_extractor.store_documents(documents, database['row_data'])
+
+def generate_single_report(report_doc, report_file, database):
+    """Save one day's prices and write its report"""
+    if isinstance(database, MemoryDatabase):
+        # The in-memory database has no stored layout, so it gets the default one
+        for collection_name, pairs in generate_report.price_updates(report_doc, 'item').items():
+            database[collection_name].upsert(pairs)
+        return generate_report.write_single_report(report_doc, report_file)
+    return generate_report.generate_single_report(report_doc, report_file, database)
+
+def find_benchmark_pdfs(directories):
+    """List the PDF files in the given directories"""
+    pdf_paths = []
+    for directory in directories:
+        pdf_paths.extend(
+            os.path.join(directory, filename)
+            for filename in sorted(os.listdir(directory))
+            if filename.endswith('.pdf')
+        )
+    return pdf_paths
+
+def timed(timings, stage, func, *args):
+    """Run func and add its wall time to the stage total"""
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage] += time.perf_counter() - start
+    return result
+
+def run_pdf(pdf_path, timings, database, report_dir):
+    """Run one PDF through every stage and return the number of table rows and items"""
+    def open_page():
+        pdf = pdfplumber.open(pdf_path)
+        page_index = page_locator.locate_table_page(pdf)
+        return pdf, pdf.pages[page_index] if page_index is not None else None
+
+    pdf, page = timed(timings, 'open', open_page)
+    try:
+        if page is None:
+            return 0, 0
+        table = timed(timings, 'extract_table', pdf_extractor.extract_page_table, page)
+    finally:
+        pdf.close()
+    if not table:
+        return 0, 0
+
+    processed_data = timed(timings, 'process_table_data', pdf_extractor.process_table_data, table)
+    date_obj = pdf_extractor.date_from_filename(pdf_path)
+    documents = timed(timings, 'build_documents', pdf_extractor.build_documents, date_obj, processed_data)
+    timed(timings, 'mongo_write', store_documents, documents, database)
+
+    report_doc = {'date': date_obj, 'data': processed_data}
+    report_file = os.path.join(report_dir, f"price_report_{date_obj.strftime('%Y-%m-%d')}.txt")
+    timed(timings, 'generate_single_report', generate_single_report, report_doc, report_file, database)
+    return len(table), len(processed_data)
+
+def run_benchmark(pdf_paths, database, repeat=1, trace_memory=False):
+    """Benchmark the pipeline stages over pdf_paths and return the results dict"""
+    timings = {stage: 0.0 for stage in STAGES}
+    table_rows = 0
+    items = 0
+
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as report_dir:
+        # The pipeline prints debugging output for every row; keep it out of the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                for pdf_path in pdf_paths:
+                    rows, pdf_items = run_pdf(pdf_path, timings, database, report_dir)
+                    table_rows += rows
+                    items += pdf_items
+    total = time.perf_counter() - start
+
+    traced_peak = None
+    if trace_memory:
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    pdf_count = len(pdf_paths) * repeat
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pdfplumber': pdfplumber.__version__,
+        'pdfs': pdf_count,
+        'table_rows': table_rows,
+        'items': items,
+        'total_seconds': total,
+        'stages': {
+            stage: {
+                'seconds': seconds,
+                'seconds_per_pdf': seconds / pdf_count if pdf_count else None
+            }
+            for stage, seconds in timings.items()
+        },
+        'throughput': {
+            'pdfs_per_second': pdf_count / total if total else None,
+            'rows_per_second': table_rows / total if total else None
+        },
+        'memory': {
+            # ru_maxrss is reported in kilobytes on Linux
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'traced_peak_bytes': traced_peak
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extraction and report pipeline')
+    parser.add_argument('directories', nargs='*', default=[os.path.join('data', 'processed')],
+                        help='directories containing PDFs (default: data/processed)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of passes over the PDFs (default: 1)')
+    parser.add_argument('--mongo-uri',
+                        help='benchmark writes against this MongoDB instead of the in-memory stand-in')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also report the peak of Python allocations (slows the run down)')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    pdf_paths = find_benchmark_pdfs(args.directories)
+    if not pdf_paths:
+        print("No PDF files found", file=sys.stderr)
+        sys.exit(1)
+
+    if args.mongo_uri:
+        database = MongoClient(args.mongo_uri, **client_options())['central_bank_benchmark']
+    else:
+        database = MemoryDatabase()
+
+    results = run_benchmark(pdf_paths, database, args.repeat, args.trace_memory)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
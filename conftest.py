@@ -0,0 +1,40 @@
+import time
+from datetime import datetime
+
+import pdf_extractor
+from price_records import PriceRecords
+
+def documents(date_obj=datetime(2024, 12, 3)):
+    """The section documents of one parsed PDF: an empty vegetables section"""
+    records = PriceRecords.empty(pdf_extractor.RECORD_TYPES)
+    return [{'date': date_obj, 'type': 'vegetables', 'page': 2, 'table_index': 0, 'data': records}]
+
+class Result:
+    def __init__(self, operations, acknowledged=True):
+        self.acknowledged = acknowledged
+        self.upserted_count = len(operations)
+        self.modified_count = 0
+
+class RecordingCollection:
+    """Stands in for row_data: records (time, operations) of every bulk_write, or raises error"""
+
+    def __init__(self, error=None, acknowledged=True):
+        self.error = error
+        self.acknowledged = acknowledged
+        self.batches = []
+
+    def record(self, operations):
+        if self.error:
+            raise self.error
+        self.batches.append((time.monotonic(), len(operations)))
+        return Result(operations, self.acknowledged)
+
+    def bulk_write(self, operations, ordered=True):
+        return self.record(operations)
+
+    def writes(self):
+        return sum(count for _, count in self.batches)
+
+class AsyncRecordingCollection(RecordingCollection):
+    async def bulk_write(self, operations, ordered=True):
+        return self.record(operations)
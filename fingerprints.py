@@ -0,0 +1,27 @@
+import json
+import hashlib
+
+def content_hash(items):
+    """
+    Hash of a section's extracted items.
+    Ingest timestamps are left out so re-ingesting the same PDF gives the same hash.
+    """
+    stable_items = [
+        {key: value for key, value in item.items() if key != 'timestamp'}
+        for item in items
+    ]
+    encoded = json.dumps(stable_items, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def date_fingerprint(sources, settings=None):
+    """
+    Fingerprint of one date from the (document id, content hash) pairs of its
+    row_data documents and the JSON-serialisable settings its outputs were made with
+    """
+    digest = hashlib.sha256()
+    if settings is not None:
+        digest.update(json.dumps(settings, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    for document_id, document_hash in sorted((str(document_id), document_hash)
+                                             for document_id, document_hash in sources):
+        digest.update(f"{document_id}:{document_hash}\n".encode('utf-8'))
+    return digest.hexdigest()
@@ -0,0 +1,134 @@
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from mongo import get_client
+
+# Item types that get their own <type>_prices collection in generate_report
+PRICE_TYPES = ['vegetables', 'other', 'fruits', 'rice', 'fish']
+
+# Indexes every query path needs: {database: {collection: [(keys, options)]}}
+INDEXES = {
+    'central_bank': {
+        # pdf_extractor upserts on (date, table_index); the report paths sort and match on date
+        'row_data': [
+            ([('date', ASCENDING), ('table_index', ASCENDING)],
+             {'name': 'date_table_index', 'unique': True})
+        ],
+        # generate_report.save_to_mongodb upserts on item
+        **{
+            f"{item_type}_prices": [
+                ([('item', ASCENDING)], {'name': 'item', 'unique': True})
+            ]
+            for item_type in PRICE_TYPES
+        },
+        # Monthly price buckets are upserted on (item, month) and read by month range
+        **{
+            f"{item_type}_prices_monthly": [
+                ([('item', ASCENDING), ('month', ASCENDING)], {'name': 'item_month', 'unique': True})
+            ]
+            for item_type in PRICE_TYPES
+        }
+    },
+    'pdf_data': {
+        # retail_vegetable queries (date, page) and runs distinct('date')
+        'extracted_tables': [
+            ([('date', ASCENDING), ('page', ASCENDING)], {'name': 'date_page'})
+        ]
+    }
+}
+
+# Representative queries whose plans must use an index:
+# (database, collection, description, explain command)
+QUERY_PLANS = [
+    ('central_bank', 'row_data', "row_data upsert on date/table_index",
+     {'find': 'row_data', 'filter': {'date': None, 'table_index': 0}}),
+    ('central_bank', 'row_data', "row_data sorted by date",
+     {'find': 'row_data', 'filter': {}, 'sort': {'date': -1}, 'limit': 1}),
+    ('pdf_data', 'extracted_tables', "extracted_tables lookup on date/page",
+     {'find': 'extracted_tables', 'filter': {'date': None, 'page': 2}}),
+    ('pdf_data', 'extracted_tables', "extracted_tables distinct dates",
+     {'distinct': 'extracted_tables', 'key': 'date'}),
+] + [
+    ('central_bank', f"{item_type}_prices", f"{item_type}_prices upsert on item",
+     {'find': f"{item_type}_prices", 'filter': {'item': ''}})
+    for item_type in PRICE_TYPES
+] + [
+    ('central_bank', f"{item_type}_prices_monthly", f"{item_type}_prices_monthly range read",
+     {'find': f"{item_type}_prices_monthly", 'filter': {'item': '', 'month': {'$gte': '', '$lte': ''}}})
+    for item_type in PRICE_TYPES
+]
+
+def ensure_indexes(client, databases=None):
+    """
+    Create any declared index that is missing.
+    Returns the names of the indexes created.
+    """
+    created = []
+    for database_name, collections in INDEXES.items():
+        if databases is not None and database_name not in databases:
+            continue
+        for collection_name, indexes in collections.items():
+            collection = client[database_name][collection_name]
+            existing = {
+                tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                      for field, direction in info['key'])
+                for info in collection.index_information().values()
+            }
+            for keys, options in indexes:
+                if tuple(keys) in existing:
+                    continue
+                try:
+                    collection.create_index(keys, **options)
+                    created.append(f"{database_name}.{collection_name}.{options['name']}")
+                except OperationFailure as e:
+                    # Most likely duplicate keys in existing data for a unique index
+                    print(f"Warning: could not create index {options['name']} on "
+                          f"{database_name}.{collection_name}: {str(e)}")
+
+    for name in created:
+        print(f"Created index {name}")
+    return created
+
+def _plan_stages(plan):
+    """Yield every stage name in a (possibly nested) query plan"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+def check_query_plans(client, databases=None):
+    """
+    Explain each representative query and warn when its winning plan is a
+    collection scan. Returns the descriptions of the queries that scan.
+    """
+    scans = []
+    for database_name, collection_name, description, command in QUERY_PLANS:
+        if databases is not None and database_name not in databases:
+            continue
+        database = client[database_name]
+        try:
+            explanation = database.command('explain', command, verbosity='queryPlanner')
+        except OperationFailure as e:
+            print(f"Warning: could not explain {description}: {str(e)}")
+            continue
+
+        winning_plan = explanation.get('queryPlanner', {}).get('winningPlan', {})
+        if 'COLLSCAN' in set(_plan_stages(winning_plan)):
+            print(f"Warning: {description} uses a collection scan "
+                  f"({database_name}.{collection_name})")
+            scans.append(description)
+    return scans
+
+def setup_indexes(client, databases=None):
+    """Create missing indexes, then verify the query plans that depend on them"""
+    ensure_indexes(client, databases)
+    return check_query_plans(client, databases)
+
+if __name__ == "__main__":
+    scans = setup_indexes(get_client())
+    if not scans:
+        print("All checked queries use an index")
@@ -0,0 +1,14 @@
+import os
+import time
+
+# Replaced after every stored batch so readers such as price_service.py can
+# tell that new data arrived by stat()ing a single file
+INGEST_MARKER = os.path.join('data', 'ingest_generation')
+
+def mark_ingested(marker=INGEST_MARKER):
+    """Signal that new documents were stored by replacing the ingest marker file"""
+    os.makedirs(os.path.dirname(marker) or '.', exist_ok=True)
+    tmp_path = f"{marker}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(f"{time.time()}\n")
+    os.replace(tmp_path, marker)
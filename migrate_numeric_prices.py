@@ -0,0 +1,120 @@
+import argparse
+
+from pymongo import UpdateOne
+
+from fingerprints import content_hash
+from indexes import PRICE_TYPES
+from price_records import SETTINGS_COLLECTION, numeric_price, store_price_values
+from mongo import get_db
+
+# Documents rewritten per bulk_write
+BATCH_SIZE = 500
+
+# Collection holding one {'_id': <collection>, 'last_id': ...} checkpoint per migrated collection
+CHECKPOINTS = SETTINGS_COLLECTION
+MIGRATION = 'numeric_prices'
+
+def numeric_item(item):
+    """Copy of a row_data item with its yesterday/today prices as doubles or None"""
+    converted = {}
+    for key, value in item.items():
+        if isinstance(value, dict) and ('today' in value or 'yesterday' in value):
+            value = {when: numeric_price(price) for when, price in value.items()}
+        converted[key] = value
+    return converted
+
+def row_data_update(doc):
+    """$set converting a row_data document; its content hash follows the stored data"""
+    items = [numeric_item(item) for item in doc.get('data', [])]
+    return {'data': items, 'content_hash': content_hash(items)}
+
+def numeric_price_data(price_data):
+    """Copy of a {'date', 'wholesale', 'retail'} price entry with numeric prices"""
+    converted = dict(price_data)
+    for kind in ('wholesale', 'retail'):
+        if isinstance(price_data.get(kind), dict):
+            converted[kind] = {market: numeric_price(price) for market, price in price_data[kind].items()}
+    return converted
+
+def price_update(doc):
+    """$set converting the day fields of a <type>_prices document or monthly bucket"""
+    update = {}
+    for key, value in doc.items():
+        if len(key) == 8 and key.isdigit() and isinstance(value, dict):
+            update[key] = numeric_price_data(value)
+    for key, value in doc.get('days', {}).items():
+        update[f'days.{key}'] = numeric_price_data(value)
+    return update
+
+def migrate_collection(database, collection_name, build_update, batch_size=BATCH_SIZE):
+    """
+    Rewrite every document of a collection in _id order, batch by batch.
+    The last _id of each written batch is checkpointed, so an interrupted
+    run continues after it. Returns the number of documents rewritten.
+    """
+    collection = database[collection_name]
+    checkpoints = database[CHECKPOINTS]
+    checkpoint_id = f"{MIGRATION}.{collection_name}"
+    checkpoint = checkpoints.find_one({'_id': checkpoint_id}) or {}
+    if checkpoint.get('done'):
+        print(f"{collection_name}: already migrated")
+        return 0
+
+    query = {'_id': {'$gt': checkpoint['last_id']}} if 'last_id' in checkpoint else {}
+    if query:
+        print(f"{collection_name}: resuming after {checkpoint['last_id']}")
+
+    migrated = 0
+    operations = []
+    last_id = None
+    for doc in collection.find(query).sort('_id', 1):
+        update = build_update(doc)
+        if update:
+            operations.append(UpdateOne({'_id': doc['_id']}, {'$set': update}))
+        last_id = doc['_id']
+        if len(operations) >= batch_size:
+            migrated += flush(collection, checkpoints, checkpoint_id, operations, last_id)
+            operations = []
+    if operations or last_id is not None:
+        migrated += flush(collection, checkpoints, checkpoint_id, operations, last_id)
+
+    checkpoints.update_one({'_id': checkpoint_id}, {'$set': {'done': True}}, upsert=True)
+    print(f"{collection_name}: migrated {migrated} documents")
+    return migrated
+
+def flush(collection, checkpoints, checkpoint_id, operations, last_id):
+    """Write one batch, then move the checkpoint past it"""
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    checkpoints.update_one({'_id': checkpoint_id}, {'$set': {'last_id': last_id}}, upsert=True)
+    return len(operations)
+
+def migrate(database, batch_size=BATCH_SIZE):
+    """
+    Convert the prices of row_data and every <type>_prices collection to numbers.
+    The stored price mode is switched first, so every writer starting from
+    now on stores numbers; stop running ingests before migrating.
+    """
+    store_price_values(database, 'number')
+    migrate_collection(database, 'row_data', row_data_update, batch_size)
+    for item_type in PRICE_TYPES:
+        for collection_name in (f"{item_type}_prices", f"{item_type}_prices_monthly"):
+            migrate_collection(database, collection_name, price_update, batch_size)
+
+def reset(database):
+    """Forget the checkpoints so the next run converts everything again"""
+    result = database[CHECKPOINTS].delete_many({'_id': {'$regex': f'^{MIGRATION}\\.'}})
+    print(f"Removed {result.deleted_count} checkpoints")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert stored prices from strings to numbers')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'documents per bulk write (default: {BATCH_SIZE})')
+    parser.add_argument('--reset', action='store_true',
+                        help='drop the checkpoints and start over')
+    args = parser.parse_args()
+    database = get_db()
+    if args.reset:
+        reset(database)
+    migrate(database, args.batch_size)
+    print("Prices are now stored as numbers by every writer")
@@ -0,0 +1,63 @@
+from pymongo import UpdateOne
+
+from generate_report import store_price_storage
+from indexes import PRICE_TYPES, ensure_indexes
+from mongo import get_client, get_db
+
+# Upserts sent per bulk_write
+BATCH_SIZE = 500
+
+def bucket_updates(doc):
+    """Split one per-item document into upserts of its monthly buckets"""
+    days_by_month = {}
+    for key, price_data in doc.items():
+        # Day fields are the YYYYMMDD keys written by save_to_mongodb
+        if len(key) == 8 and key.isdigit():
+            days_by_month.setdefault(key[:6], {})[f'days.{key}'] = price_data
+
+    return [
+        UpdateOne(
+            {'item': doc['item'], 'month': month},
+            {'$set': {'item': doc['item'], 'type': doc.get('type'), 'month': month, **days}},
+            upsert=True
+        )
+        for month, days in sorted(days_by_month.items())
+    ]
+
+def copy_buckets(database, batch_size=BATCH_SIZE):
+    """Copy every <type>_prices document into monthly buckets in <type>_prices_monthly"""
+    for item_type in PRICE_TYPES:
+        source = database[f"{item_type}_prices"]
+        target = database[f"{item_type}_prices_monthly"]
+
+        operations = []
+        items = 0
+        buckets = 0
+        for doc in source.find():
+            operations.extend(bucket_updates(doc))
+            items += 1
+            if len(operations) >= batch_size:
+                target.bulk_write(operations, ordered=False)
+                buckets += len(operations)
+                operations = []
+        if operations:
+            target.bulk_write(operations, ordered=False)
+            buckets += len(operations)
+
+        print(f"Migrated {items} {item_type} items into {buckets} monthly buckets")
+
+def migrate(database, batch_size=BATCH_SIZE):
+    """
+    Move the per-item prices to monthly buckets and switch the stored layout,
+    so save_to_mongodb and load_price_history use the buckets from then on.
+    The source collections are left untouched and re-running is safe.
+    """
+    copy_buckets(database, batch_size)
+    store_price_storage(database, 'monthly')
+    # Pick up prices a writer stored in the old layout before it saw the switch
+    copy_buckets(database, batch_size)
+
+if __name__ == "__main__":
+    ensure_indexes(get_client(), ['central_bank'])
+    migrate(get_db())
+    print("Prices are now stored in monthly buckets")
@@ -0,0 +1,86 @@
+import os
+import json
+import fcntl
+
+# Page index of the price table per page layout, so later PDFs with the same
+# layout check that page first. Known PDFs never get here: their tables come
+# from the table cache.
+LOCATIONS_PATH = os.path.join('cache', 'page_locations.json')
+
+# Fraction of the page height, from the top, searched for the table header
+HEADER_BAND = 0.25
+
+# Text that must appear in the header band and the section labels that must
+# appear on the page (read from the raw characters, without layout analysis)
+HEADER_TEXT = 'WHOLESALE'
+SECTION_LABELS = ['VEGETABLES', 'OTHER', 'FRUITS', 'RICE', 'FISH']
+
+def layout_key(pdf):
+    """Page count and page sizes of a PDF"""
+    sizes = ','.join(f"{round(float(page.width))}x{round(float(page.height))}" for page in pdf.pages)
+    return f"{len(pdf.pages)}:{sizes}"
+
+def load_locations(path=LOCATIONS_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable page locations {path}: {str(e)}")
+        return {}
+
+def save_location(layout, index, path=LOCATIONS_PATH):
+    """
+    Record where the table of a layout is. Writers from other processes are
+    serialised with a lock and merged in, and the file is replaced atomically.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            locations = load_locations(path)
+            locations[layout] = index
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(locations, f)
+            os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def is_table_page(page):
+    """
+    Check for the price table: the header text in the top band of the page
+    and every section label among the page's characters. This parses the
+    page's chars, but pdfplumber keeps them on the Page, so on the table
+    page the extraction that follows reuses them; only pages that turn out
+    not to hold the table cost an extra parse.
+    """
+    band = page.crop((0, 0, page.width, page.height * HEADER_BAND))
+    if HEADER_TEXT not in (band.extract_text() or '').upper():
+        return False
+    # The section labels are letter-spaced ('V E G E T A B L E S'), so spaces are dropped
+    text = ''.join(char['text'] for char in page.chars if not char['text'].isspace())
+    return all(label in text for label in SECTION_LABELS)
+
+def locate_table_page(pdf, path=None):
+    """
+    Return the 0-based index of the page holding the price table, or None.
+    The page stored for the PDF's layout is checked first, then the other
+    pages in order. The file is only rewritten when a layout's page changes.
+    """
+    path = LOCATIONS_PATH if path is None else path
+    locations = load_locations(path)
+    layout = layout_key(pdf)
+    first = locations.get(layout)
+    candidates = list(range(len(pdf.pages)))
+    if first is not None and first < len(pdf.pages):
+        candidates.remove(first)
+        candidates.insert(0, first)
+
+    for index in candidates:
+        if is_table_page(pdf.pages[index]):
+            if locations.get(layout) != index:
+                save_location(layout, index, path)
+            return index
+    return None
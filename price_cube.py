@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import fcntl
+import bisect
+import contextlib
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from mongo import get_db
+from price_records import PriceRecords
+from sections import MARKETS
+
+# Dense (date x item x market) array of today's prices, memory-mapped from
+# a prices.<generation>.bin file named by the index.json sidecar, which also
+# holds the axis labels. Dates are kept sorted so date ranges are contiguous
+# slices. Saving index.json is the commit point of every append.
+CUBE_DIR = os.path.join('data', 'cube')
+DATA_FILE = 'prices.bin'
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'lock'
+DTYPE = 'float32'
+
+# Room reserved on the date axis when the file has to grow
+INITIAL_DATE_CAPACITY = 64
+
+def date_label(date):
+    """Label used on the date axis"""
+    return date.strftime('%Y-%m-%d') if isinstance(date, datetime) else str(date)[:10]
+
+def item_label(item_type, item):
+    """Label used on the item axis"""
+    return f"{item_type}/{item}"
+
+def load_index(cube_dir=CUBE_DIR):
+    """Return the axis index, or an empty one if the cube does not exist yet"""
+    try:
+        with open(os.path.join(cube_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {
+            'dtype': DTYPE,
+            'dates': [],
+            'items': [],
+            'markets': list(MARKETS),
+            'date_capacity': 0,
+            'generation': 0,
+            'data_file': DATA_FILE
+        }
+
+@contextlib.contextmanager
+def cube_lock(cube_dir=CUBE_DIR, exclusive=True):
+    """
+    flock on the cube directory's lock file. Writers hold it exclusively for
+    a whole append; readers hold it shared while pairing index and data file.
+    """
+    os.makedirs(cube_dir, exist_ok=True)
+    with open(os.path.join(cube_dir, LOCK_FILE), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _save_index(index, cube_dir):
+    path = os.path.join(cube_dir, INDEX_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _data_path(index, cube_dir):
+    # Cubes written before data files were versioned have no 'data_file'
+    return os.path.join(cube_dir, index.get('data_file', DATA_FILE))
+
+def _map(index, cube_dir, mode):
+    shape = (index['date_capacity'], len(index['items']), len(index['markets']))
+    if 0 in shape:
+        return np.full(shape, np.nan, dtype=index['dtype'])
+    return np.memmap(_data_path(index, cube_dir), dtype=index['dtype'], mode=mode, shape=shape)
+
+def open_cube(cube_dir=CUBE_DIR):
+    """
+    Return (prices, index) with prices as a read-only memmap of shape
+    (dates, items, markets) covering only the stored dates.
+    """
+    if not os.path.isdir(cube_dir):
+        index = load_index(cube_dir)
+        return _map(index, cube_dir, 'r'), index
+    with cube_lock(cube_dir, exclusive=False):
+        index = load_index(cube_dir)
+        prices = _map(index, cube_dir, 'r')
+    return prices[:len(index['dates'])], index
+
+def _write_day(day, day_records, item_positions, market_positions):
+    """Write the today prices of one date's records into its (items, markets) slice"""
+    for records in day_records:
+        rows = np.array([item_positions[item_label(records.types[code][0], name)]
+                         for code, name in zip(records.type_codes.tolist(), records.names)])
+        day[rows] = np.nan
+        for code, (_, type_markets) in enumerate(records.types):
+            of_type = records.type_codes == code
+            if not of_type.any():
+                continue
+            for market_idx, market in enumerate(type_markets):
+                day[rows[of_type], market_positions[market]] = records.prices[of_type, 2 * market_idx + 1]
+
+def _append_in_place(index, cube_dir, records_by_date):
+    """
+    Write dates that all sort after the stored ones into the unused rows at
+    the end of the current data file, growing it first if needed. Readers
+    only see the first len(dates) rows, so nothing is visible until the
+    index naming the new dates is saved.
+    """
+    labels = sorted(records_by_date)
+    used = len(index['dates'])
+    needed = used + len(labels)
+    if needed > index['date_capacity']:
+        date_capacity = max(needed, 2 * index['date_capacity'], INITIAL_DATE_CAPACITY)
+        row_bytes = len(index['items']) * len(index['markets']) * np.dtype(index['dtype']).itemsize
+        with open(_data_path(index, cube_dir), 'r+b') as f:
+            f.truncate(date_capacity * row_bytes)
+        index['date_capacity'] = date_capacity
+
+    prices = _map(index, cube_dir, 'r+')
+    item_positions = {label: position for position, label in enumerate(index['items'])}
+    market_positions = {market: position for position, market in enumerate(index['markets'])}
+    prices[used:needed] = np.nan
+    for position, label in enumerate(labels, used):
+        _write_day(prices[position], records_by_date[label], item_positions, market_positions)
+    prices.flush()
+    del prices
+    index['dates'] = index['dates'] + labels
+
+def _rewrite(index, cube_dir, records_by_date, items, markets):
+    """
+    Write a new data file holding the stored and new dates in order, copying
+    every stored row once. The previous file is left untouched, so a crash
+    before the index is saved leaves the old cube intact.
+    Returns the path of the data file the new index replaces.
+    """
+    old_path = _data_path(index, cube_dir)
+    dates = sorted(set(index['dates']) | set(records_by_date))
+    generation = index.get('generation', 0) + 1
+    data_file = f"prices.{generation}.bin"
+    shape = (len(dates), len(items), len(markets))
+    prices = np.memmap(os.path.join(cube_dir, data_file), dtype=index['dtype'], mode='w+', shape=shape)
+    prices[:] = np.nan
+
+    used = len(index['dates'])
+    if used:
+        # Both date lists are sorted, so the stored rows keep their relative order
+        stored = set(index['dates'])
+        date_positions = [position for position, label in enumerate(dates) if label in stored]
+        item_positions = [items.index(item) for item in index['items']]
+        market_positions = [markets.index(market) for market in index['markets']]
+        old = _map(index, cube_dir, 'r')
+        prices[np.ix_(date_positions, item_positions, market_positions)] = old[:used]
+        del old
+
+    item_positions = {label: position for position, label in enumerate(items)}
+    market_positions = {market: position for position, market in enumerate(markets)}
+    for position, label in enumerate(dates):
+        if label in records_by_date:
+            _write_day(prices[position], records_by_date[label], item_positions, market_positions)
+    prices.flush()
+    del prices
+
+    index.update({
+        'dates': dates,
+        'items': items,
+        'markets': markets,
+        'date_capacity': len(dates),
+        'generation': generation,
+        'data_file': data_file
+    })
+    return old_path
+
+def append_documents(documents, cube_dir=CUBE_DIR):
+    """
+    Write the today prices of row_data section documents into the cube.
+    Re-ingested dates overwrite their previous values.
+
+    Dates later than every stored date are appended in place. Anything else
+    (back-filled or re-ingested dates, new items or markets) writes a new
+    data file in a single pass over the sorted dates. Either way the index
+    is saved last, so an interrupted append leaves the previous cube
+    readable. Writers are serialised with cube_lock().
+    """
+    # Group the records by date first so each date row is written once
+    records_by_date = {}
+    for document in documents:
+        records = document.get('data', [])
+        if not isinstance(records, PriceRecords):
+            records = PriceRecords.from_items(records)
+        if len(records):
+            records_by_date.setdefault(date_label(document['date']), []).append(records)
+    if not records_by_date:
+        return
+
+    with cube_lock(cube_dir):
+        index = load_index(cube_dir)
+
+        # Grow the axes before writing
+        items = list(index['items'])
+        known_items = set(items)
+        markets = list(index['markets'])
+        for day_records in records_by_date.values():
+            for records in day_records:
+                for code, name in zip(records.type_codes.tolist(), records.names):
+                    label = item_label(records.types[code][0], name)
+                    if label not in known_items:
+                        known_items.add(label)
+                        items.append(label)
+                for _, type_markets in records.types:
+                    for market in type_markets:
+                        if market not in markets:
+                            markets.append(market)
+
+        dates = index['dates']
+        replaced_path = None
+        if dates and items == index['items'] and markets == index['markets'] and min(records_by_date) > dates[-1]:
+            _append_in_place(index, cube_dir, records_by_date)
+        else:
+            replaced_path = _rewrite(index, cube_dir, records_by_date, items, markets)
+
+        _save_index(index, cube_dir)
+        if replaced_path and replaced_path != _data_path(index, cube_dir) and os.path.exists(replaced_path):
+            # Readers that still map the old file keep their copy until they close it
+            os.remove(replaced_path)
+
+def date_range(index, start=None, end=None):
+    """Slice of the date axis between two 'YYYY-MM-DD' labels (inclusive)"""
+    dates = index['dates']
+    first = bisect.bisect_left(dates, start) if start else 0
+    last = bisect.bisect_right(dates, end) if end else len(dates)
+    return slice(first, last)
+
+def item_series(item_type, item, market, start=None, end=None, cube_dir=CUBE_DIR):
+    """Return (dates, prices) for one item at one market as a view into the cube"""
+    prices, index = open_cube(cube_dir)
+    span = date_range(index, start, end)
+    row = index['items'].index(item_label(item_type, item))
+    column = index['markets'].index(market)
+    return index['dates'][span], prices[span, row, column]
+
+def rebuild_from_mongo(collection, cube_dir=CUBE_DIR):
+    """Recreate the cube from every document in row_data"""
+    with cube_lock(cube_dir):
+        for filename in os.listdir(cube_dir):
+            if filename == INDEX_FILE or filename.endswith('.bin'):
+                os.remove(os.path.join(cube_dir, filename))
+
+    batch = []
+    for document in collection.find({}, {'date': 1, 'data': 1}).sort('date', 1):
+        batch.append(document)
+        if len(batch) >= 500:
+            append_documents(batch, cube_dir)
+            batch = []
+    if batch:
+        append_documents(batch, cube_dir)
+
+    index = load_index(cube_dir)
+    print(f"Built price cube with {len(index['dates'])} dates, {len(index['items'])} items "
+          f"and {len(index['markets'])} markets")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Maintain and query the memory-mapped price cube')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help='rebuild the cube from central_bank.row_data')
+    series_parser = subparsers.add_parser('series', help='print the prices of one item at one market')
+    series_parser.add_argument('type')
+    series_parser.add_argument('item')
+    series_parser.add_argument('market', choices=MARKETS)
+    series_parser.add_argument('--start', help='first date (YYYY-MM-DD)')
+    series_parser.add_argument('--end', help='last date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        rebuild_from_mongo(get_db()['row_data'])
+    else:
+        try:
+            dates, values = item_series(args.type, args.item, args.market, args.start, args.end)
+        except ValueError:
+            print(f"No prices for {args.type}/{args.item} at {args.market}")
+            sys.exit(1)
+        for date, value in zip(dates, values):
+            print(f"{date}  {value:,.2f}" if not np.isnan(value) else f"{date}  N/A")
@@ -0,0 +1,165 @@
+import math
+
+import numpy as np
+
+# How prices are written to MongoDB: 'string' keeps the original '800.0' / "N/A"
+# strings, 'number' stores doubles with null for missing prices so that range
+# queries and $avg/$min/$max run on the server. The mode is stored in the
+# database itself (see migrate_numeric_prices.py) and every writer loads it
+# with load_price_values() before storing anything.
+PRICE_VALUES = 'string'
+
+# Document of the migrations collection holding the stored mode
+SETTINGS_COLLECTION = 'migrations'
+PRICE_VALUES_ID = 'price_values'
+
+def load_price_values(database):
+    """Set PRICE_VALUES to the mode stored in database, 'string' if none is stored"""
+    global PRICE_VALUES
+    setting = database[SETTINGS_COLLECTION].find_one({'_id': PRICE_VALUES_ID})
+    PRICE_VALUES = setting['mode'] if setting else 'string'
+    return PRICE_VALUES
+
+def store_price_values(database, mode):
+    """Record the mode every writer of database must use"""
+    database[SETTINGS_COLLECTION].update_one({'_id': PRICE_VALUES_ID}, {'$set': {'mode': mode}}, upsert=True)
+
+def format_price_value(value):
+    """Format a parsed price as stored in MongoDB: '800.0', or "N/A" when missing"""
+    return "N/A" if np.isnan(value) else str(float(value))
+
+def parse_price_value(value):
+    """Stored price ('800.0', 800.0, "N/A" or None) back to a float, NaN when missing"""
+    try:
+        return float(value) if value is not None else np.nan
+    except (ValueError, TypeError):
+        return np.nan
+
+def numeric_price(value):
+    """Stored price as a double, or None when it is missing"""
+    value = parse_price_value(value)
+    return None if math.isnan(value) else value
+
+def stored_price(value, mode=None):
+    """A price in the form PRICE_VALUES (or mode) stores it; 'string' leaves values as they are"""
+    mode = PRICE_VALUES if mode is None else mode
+    if mode == 'number':
+        return numeric_price(value)
+    return value
+
+class PriceRecords:
+    """
+    The extracted items of one or more sections, held as arrays.
+
+    types is the type table: a list of (type, markets) pairs, where markets
+    names the yesterday/today column pairs of that type. Row i is the item
+    names[i] of types[type_codes[i]], and prices[i] holds its
+    (yesterday, today) pairs in that type's market order, NaN when missing.
+    Nested dicts are only built by to_items(), where the data is stored.
+    """
+    __slots__ = ('types', 'type_codes', 'names', 'prices', 'timestamp')
+
+    def __init__(self, types, type_codes, names, prices, timestamp=None):
+        self.types = types
+        self.type_codes = np.asarray(type_codes, dtype=np.int8)
+        self.names = names
+        self.prices = prices
+        self.timestamp = timestamp
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def empty(cls, types):
+        width = 2 * max((len(markets) for _, markets in types), default=0)
+        return cls(types, [], [], np.empty((0, width)))
+
+    @classmethod
+    def from_items(cls, items):
+        """Build records from item dicts as stored in row_data"""
+        types = []
+        positions = {}
+        type_codes = []
+        names = []
+        rows = []
+        for item in items:
+            item_type = item['type']
+            if item_type not in positions:
+                positions[item_type] = len(types)
+                markets = [key for key, value in item.items() if isinstance(value, dict)]
+                types.append((item_type, markets))
+            code = positions[item_type]
+            type_codes.append(code)
+            names.append(item['item'])
+            row = []
+            for market in types[code][1]:
+                prices = item.get(market) or {}
+                row.append(parse_price_value(prices.get('yesterday')))
+                row.append(parse_price_value(prices.get('today')))
+            rows.append(row)
+
+        width = 2 * max((len(markets) for _, markets in types), default=0)
+        prices = np.full((len(rows), width), np.nan)
+        for position, row in enumerate(rows):
+            prices[position, :len(row)] = row
+        timestamp = items[0].get('timestamp') if items else None
+        return cls(types, type_codes, names, prices, timestamp)
+
+    def select(self, mask):
+        """Records of the rows where mask is true"""
+        positions = np.flatnonzero(mask)
+        return PriceRecords(self.types, self.type_codes[positions],
+                            [self.names[position] for position in positions],
+                            self.prices[positions], self.timestamp)
+
+    def type_names(self):
+        """Types that have rows, in type table order"""
+        present = set(np.unique(self.type_codes).tolist())
+        return [item_type for code, (item_type, _) in enumerate(self.types) if code in present]
+
+    def section(self, item_type):
+        """Records of one type"""
+        codes = [code for code, (name, _) in enumerate(self.types) if name == item_type]
+        return self.select(np.isin(self.type_codes, codes))
+
+    def by_type(self):
+        """{type: records} in type table order, like group_items_by_type"""
+        return {item_type: self.section(item_type) for item_type in self.type_names()}
+
+    def has_market(self, market):
+        """Mask of the rows whose type has a price pair for market"""
+        codes = [code for code, (_, markets) in enumerate(self.types) if market in markets]
+        return np.isin(self.type_codes, codes)
+
+    def column(self, market, when='today'):
+        """Prices of one market for every row, NaN for rows whose type has no such market"""
+        values = np.full(len(self), np.nan)
+        offset = 1 if when == 'today' else 0
+        for code, (_, markets) in enumerate(self.types):
+            if market in markets:
+                rows = self.type_codes == code
+                values[rows] = self.prices[rows, 2 * markets.index(market) + offset]
+        return values
+
+    def to_items(self, mode=None):
+        """
+        Item dicts as stored in row_data, with prices as '800.0' or "N/A"
+        strings, or as doubles and None in the 'number' PRICE_VALUES mode.
+        """
+        mode = PRICE_VALUES if mode is None else mode
+        items = []
+        for code, name, values in zip(self.type_codes.tolist(), self.names, self.prices):
+            item_type, markets = self.types[code]
+            if mode == 'number':
+                prices = [None if np.isnan(value) else float(value) for value in values[:2 * len(markets)]]
+            else:
+                prices = [format_price_value(value) for value in values[:2 * len(markets)]]
+            item = {'type': item_type, 'item': name}
+            for market_idx, market in enumerate(markets):
+                item[market] = {
+                    'yesterday': prices[2 * market_idx],
+                    'today': prices[2 * market_idx + 1]
+                }
+            item['timestamp'] = self.timestamp
+            items.append(item)
+        return items
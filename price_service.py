@@ -0,0 +1,201 @@
+import os
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import price_cube
+from ingest_marker import INGEST_MARKER
+from report_render import price_value
+from sections import MARKETS
+from mongo import get_db
+
+# Responses kept in memory; the least recently used are dropped first
+CACHE_SIZE = 256
+
+class ResponseCache:
+    """
+    Bounded LRU of encoded responses. The whole cache is dropped when the
+    ingest marker written by ingest_marker.mark_ingested changes.
+    """
+
+    def __init__(self, size=CACHE_SIZE, marker=INGEST_MARKER):
+        self.size = size
+        self.marker = marker
+        self.entries = OrderedDict()
+        self.generation = self._marker_state()
+        self.lock = threading.Lock()
+
+    def _marker_state(self):
+        try:
+            stat = os.stat(self.marker)
+        except FileNotFoundError:
+            return None
+        # The marker is replaced, not rewritten, so the inode changes on every ingest
+        return stat.st_ino, stat.st_mtime_ns
+
+    def get(self, key):
+        """
+        Return (body, generation): the cached body or None, and the ingest
+        generation seen, which must be passed to put() with the body built.
+        """
+        generation = self._marker_state()
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+                return None, generation
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body, generation
+
+    def put(self, key, body, generation):
+        """Cache body unless an ingest happened since the get() that returned generation"""
+        if self._marker_state() != generation:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+def item_prices(item):
+    """Extracted item -> {'type', 'item', market: {'yesterday', 'today'}} with float prices"""
+    prices = {'type': item['type'], 'item': item['item']}
+    for market in MARKETS:
+        if market in item:
+            prices[market] = {
+                'yesterday': price_value(item[market].get('yesterday')),
+                'today': price_value(item[market].get('today'))
+            }
+    return prices
+
+def prices_for_date(row_data, date):
+    """
+    Prices of every item on a date. Items repeated across documents keep
+    their most recent extraction, as in generate_report's __main__.
+    """
+    unique_items = {}
+    for doc in row_data.find({'date': date}, {'data': 1}):
+        for item in doc.get('data', []):
+            item_key = (item['type'], item['item'])
+            if item_key not in unique_items or item['timestamp'] > unique_items[item_key]['timestamp']:
+                unique_items[item_key] = item
+    return {
+        'date': date.strftime('%Y-%m-%d'),
+        'items': [item_prices(item) for item in unique_items.values()]
+    }
+
+def latest_prices(row_data):
+    latest = row_data.find_one({}, {'date': 1}, sort=[('date', -1)])
+    if latest is None:
+        return None
+    return prices_for_date(row_data, latest['date'])
+
+def item_history(item_type, item, market=None, start=None, end=None, cube_dir=price_cube.CUBE_DIR):
+    """Today prices of one item per date from the price cube, by market"""
+    prices, index = price_cube.open_cube(cube_dir)
+    label = price_cube.item_label(item_type, item)
+    if label not in index['items']:
+        return None
+    markets = [market] if market else index['markets']
+    if any(name not in index['markets'] for name in markets):
+        return None
+
+    span = price_cube.date_range(index, start, end)
+    row = index['items'].index(label)
+    history = {'type': item_type, 'item': item, 'dates': index['dates'][span]}
+    for name in markets:
+        values = prices[span, row, index['markets'].index(name)]
+        history[name] = [None if np.isnan(value) else float(value) for value in values]
+    return history
+
+class PriceHandler(BaseHTTPRequestHandler):
+    """
+    GET /prices/latest
+    GET /prices/<YYYY-MM-DD>
+    GET /history/<type>/<item>[?market=...&start=YYYY-MM-DD&end=YYYY-MM-DD]
+    """
+    cache = None
+    row_data = None
+
+    def do_GET(self):
+        body, generation = self.cache.get(self.path)
+        if body is None:
+            try:
+                status, payload = self.route()
+            except Exception as e:
+                print(f"Error serving {self.path}: {str(e)}")
+                status, payload = 500, {'error': 'internal error'}
+            body = json.dumps(payload).encode('utf-8')
+            if status != 200:
+                self.respond(status, body)
+                return
+            self.cache.put(self.path, body, generation)
+        self.respond(200, body)
+
+    def route(self):
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if len(parts) == 2 and parts[0] == 'prices':
+            if parts[1] == 'latest':
+                result = latest_prices(self.row_data)
+            else:
+                try:
+                    date = datetime.strptime(parts[1], '%Y-%m-%d')
+                except ValueError:
+                    return 400, {'error': f"bad date {parts[1]!r}, expected YYYY-MM-DD"}
+                result = prices_for_date(self.row_data, date)
+                if not result['items']:
+                    result = None
+        elif len(parts) == 3 and parts[0] == 'history':
+            result = item_history(parts[1], parts[2], query.get('market'), query.get('start'), query.get('end'))
+        else:
+            return 404, {'error': f"unknown path {url.path}"}
+
+        if result is None:
+            return 404, {'error': 'no data'}
+        return 200, result
+
+    def respond(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; every request would otherwise print a line
+        pass
+
+def serve(host='127.0.0.1', port=8000, cache_size=CACHE_SIZE):
+    PriceHandler.cache = ResponseCache(cache_size)
+    PriceHandler.row_data = get_db()['row_data']
+    server = ThreadingHTTPServer((host, port), PriceHandler)
+    print(f"Serving prices on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve latest prices, daily prices and item histories as JSON')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on (default: 8000)')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help=f'responses kept in the LRU cache (default: {CACHE_SIZE})')
+    args = parser.parse_args()
+    try:
+        serve(args.host, args.port, args.cache_size)
+    except KeyboardInterrupt:
+        print("Stopped serving")
@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import statistics
+import contextlib
+import io
+
+import pdf_extractor
+from price_records import PriceRecords
+from report_render import REPORT_LAYOUTS, SECTION_TITLES, format_price
+
+# Golden files, one per date, holding the yesterday and today price of every
+# report column. The today prices were seeded from the committed text
+# reports, the yesterday prices added from the PDFs, and both checked field by
+# field against the PDFs, so they hold what the PDFs say, not what the
+# extractor produced. Edit them by hand; --update-golden only seeds the today
+# prices of dates that have no golden file yet.
+GOLDEN_DIR = 'golden'
+REPORTS_DIR = 'reports'
+PDF_DIR = os.path.join('data', 'processed')
+
+# Timed runs per PDF; the median is reported
+REPEAT = 1
+
+# Golden fields the extractor is known to get wrong, by date, as
+# (type, item, market, column). Price cells are only read up to '.00', so
+# prices with cents like 39.50 come out as N/A. Any other difference fails
+# the run unless --min-accuracy is given.
+KNOWN_WRONG = {
+    '2024-12-03': [('other', 'Egg (White)', 'pettah_retail', 'yesterday'),
+                   ('other', 'Egg (White)', 'pettah_retail', 'today')],
+    '2024-12-04': [('other', 'Egg (White)', 'pettah_retail', 'yesterday'),
+                   ('other', 'Egg (White)', 'pettah_retail', 'today')],
+    '2024-12-05': [('other', 'Egg (White)', 'pettah_retail', 'yesterday'),
+                   ('other', 'Egg (White)', 'pettah_retail', 'today')]
+}
+
+def parse_report(path):
+    """
+    Read the price tables of a text report written by generate_single_report.
+    Returns [type, item, market, 'today', price] rows with prices as formatted
+    in the report ('1,000.00' or 'N/A'); the reports hold no yesterday prices.
+    """
+    titles = {title: section for section, title in SECTION_TITLES.items()}
+    fields = []
+    item_type = None
+    columns = None
+    with open(path, 'r') as f:
+        lines = f.read().split('\n')
+
+    for position, line in enumerate(lines):
+        following = lines[position + 1] if position + 1 < len(lines) else ''
+        if line and line == line.upper() and line.strip() and following.startswith('====='):
+            item_type = line.strip().lower()
+            columns = None
+        elif line in titles and item_type:
+            layout = REPORT_LAYOUTS.get(item_type, REPORT_LAYOUTS['default'])
+            columns = [market for _, market, _ in layout[titles[line]]]
+        elif not line:
+            # A blank line ends the table
+            columns = None
+        elif columns and not line.startswith(('-', 'Item ')):
+            # Prices never contain spaces, so the item name is everything before the price columns
+            item, *prices = line.rsplit(None, len(columns))
+            fields.extend([item_type, item.rstrip(), market, 'today', price]
+                          for market, price in zip(columns, prices))
+    return fields
+
+def build_golden(reports_dir=REPORTS_DIR, golden_dir=GOLDEN_DIR, pdf_dir=PDF_DIR, overwrite=False):
+    """
+    Seed golden/<date>.json from reports/price_report_<date>.txt for dates
+    without a golden file. The reports come from the extractor under test,
+    so seeded files must be checked against the PDF before they are
+    committed. Existing files are only replaced with overwrite.
+    """
+    os.makedirs(golden_dir, exist_ok=True)
+    written = []
+    for filename in sorted(os.listdir(reports_dir)):
+        if not (filename.startswith('price_report_') and filename.endswith('.txt')):
+            continue
+        date = filename[len('price_report_'):-len('.txt')]
+        path = os.path.join(golden_dir, f"{date}.json")
+        if os.path.exists(path) and not overwrite:
+            print(f"Keeping verified {path}; pass --force to replace it")
+            continue
+        pdf_path = os.path.join(pdf_dir, f"{date}.pdf")
+        fields = parse_report(os.path.join(reports_dir, filename))
+        # One field per line keeps diffs of the golden files readable
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'{{"date": {json.dumps(date)}, "pdf": {json.dumps(pdf_path)}, "fields": [\n')
+            f.write(',\n'.join(json.dumps(field) for field in fields))
+            f.write('\n]}\n')
+        written.append(path)
+    return written
+
+def load_golden(golden_dir=GOLDEN_DIR):
+    goldens = []
+    for filename in sorted(os.listdir(golden_dir)):
+        if filename.endswith('.json'):
+            with open(os.path.join(golden_dir, filename), 'r', encoding='utf-8') as f:
+                goldens.append(json.load(f))
+    return goldens
+
+def extract_uncached(pdf_path):
+    """The production path without the table cache"""
+    return pdf_extractor.extract_pdf_data(pdf_path, use_cache=False)
+
+def extract_cached(pdf_path):
+    """The production path including the table cache"""
+    return pdf_extractor.extract_pdf_data(pdf_path, use_cache=True)
+
+# Backends by name; any 'module:function' taking a PDF path and returning
+# section documents like extract_pdf_data can be given instead
+BACKENDS = {
+    'extract': extract_uncached,
+    'cached': extract_cached
+}
+
+def resolve_backend(name):
+    if name in BACKENDS:
+        return BACKENDS[name]
+    module_name, _, function_name = name.partition(':')
+    if not function_name:
+        raise ValueError(f"unknown backend {name!r}; use one of {', '.join(BACKENDS)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def extracted_fields(documents):
+    """[type, item, market, column, price] rows of the report columns, formatted as the report prints them"""
+    fields = []
+    for document in documents or []:
+        data = document['data']
+        items = data.to_items() if isinstance(data, PriceRecords) else data
+        for item in items:
+            layout = REPORT_LAYOUTS.get(item['type'], REPORT_LAYOUTS['default'])
+            for section in layout.values():
+                for _, market, _ in section:
+                    for column in ('yesterday', 'today'):
+                        price = format_price(item.get(market, {}).get(column))
+                        fields.append([item['type'], item['item'], market, column, price])
+    return fields
+
+def keyed(fields):
+    """{(type, item, market, column, occurrence): price}, numbering repeated item names"""
+    seen = {}
+    result = {}
+    for item_type, item, market, column, price in fields:
+        occurrence = seen.get((item_type, item, market, column), 0)
+        seen[(item_type, item, market, column)] = occurrence + 1
+        result[(item_type, item, market, column, occurrence)] = price
+    return result
+
+def compare(golden_fields, fields, known_wrong=()):
+    """
+    Field-level comparison: counts plus the first differences. Differences
+    in the known_wrong (type, item, market, column) fields are counted as
+    wrong but not as unexpected.
+    """
+    expected = keyed(golden_fields)
+    actual = keyed(fields)
+    known_wrong = set(known_wrong)
+    correct = sum(1 for key, price in expected.items() if actual.get(key) == price)
+    wrong = [(key, price, actual[key]) for key, price in expected.items()
+             if key in actual and actual[key] != price]
+    missing = [key for key in expected if key not in actual]
+    extra = [key for key in actual if key not in expected]
+    unexpected = [key for key, _, _ in wrong if key[:4] not in known_wrong]
+    now_correct = [key for key, price in expected.items()
+                   if key[:4] in known_wrong and actual.get(key) == price]
+    return {
+        'fields': len(expected),
+        'correct': correct,
+        'wrong': len(wrong),
+        'missing': len(missing),
+        'extra': len(extra),
+        'unexpected': len(unexpected) + len(missing) + len(extra),
+        'accuracy': correct / len(expected) if expected else 1.0,
+        'examples': [
+            *(f"wrong {'/'.join(map(str, key[:4]))}: expected {want}, got {got}"
+              f"{' (known)' if key[:4] in known_wrong else ''}" for key, want, got in wrong[:5]),
+            *(f"missing {'/'.join(map(str, key[:4]))}" for key in missing[:5]),
+            *(f"extra {'/'.join(map(str, key[:4]))}" for key in extra[:5]),
+            *(f"now correct {'/'.join(map(str, key[:4]))}; drop it from KNOWN_WRONG" for key in now_correct[:5])
+        ]
+    }
+
+def run_backend(backend, goldens, repeat=REPEAT):
+    """Score a backend over every golden PDF"""
+    results = []
+    for golden in goldens:
+        latencies = []
+        documents = None
+        for _ in range(repeat):
+            # The extractors print every table row; keep that out of the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                documents = backend(golden['pdf'])
+                latencies.append(time.perf_counter() - start)
+        result = compare(golden['fields'], extracted_fields(documents), KNOWN_WRONG.get(golden['date'], ()))
+        result['pdf'] = golden['pdf']
+        result['seconds'] = statistics.median(latencies)
+        results.append(result)
+
+    fields = sum(result['fields'] for result in results)
+    correct = sum(result['correct'] for result in results)
+    return {
+        'accuracy': correct / fields if fields else 1.0,
+        'fields': fields,
+        'correct': correct,
+        'unexpected': sum(result['unexpected'] for result in results),
+        'median_seconds_per_pdf': statistics.median(result['seconds'] for result in results) if results else None,
+        'pdfs': results
+    }
+
+def print_summary(name, summary):
+    print(f"{name}: accuracy {summary['accuracy']:.2%} ({summary['correct']}/{summary['fields']} fields), "
+          f"median {summary['median_seconds_per_pdf'] * 1000:.1f} ms per PDF")
+    for result in summary['pdfs']:
+        print(f"  {os.path.basename(result['pdf'])}: {result['correct']}/{result['fields']} "
+              f"({result['wrong']} wrong, {result['missing']} missing, {result['extra']} extra), "
+              f"{result['seconds'] * 1000:.1f} ms")
+        for example in result['examples']:
+            print(f"    {example}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Score extraction backends against the golden reports')
+    parser.add_argument('backends', nargs='*', default=['extract'],
+                        help=f"backends to run: {', '.join(BACKENDS)} or module:function (default: extract)")
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help=f'timed runs per PDF (default: {REPEAT})')
+    parser.add_argument('--min-accuracy', type=float,
+                        help='fail when a backend scores below this '
+                             '(default: fail on any difference not listed in KNOWN_WRONG)')
+    parser.add_argument('--max-seconds', type=float,
+                        help='fail when the median time per PDF is above this')
+    parser.add_argument('--update-golden', action='store_true',
+                        help='seed golden files for report dates that have none (check them against the PDFs)')
+    parser.add_argument('--force', action='store_true',
+                        help='with --update-golden, also replace the existing verified golden files')
+    parser.add_argument('--output', help='also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.update_golden:
+        for path in build_golden(overwrite=args.force):
+            print(f"Wrote {path}; check it against the PDF before committing")
+    goldens = load_golden()
+    if not goldens:
+        print("No golden files found; run with --update-golden", file=sys.stderr)
+        sys.exit(1)
+
+    failed = False
+    summaries = {}
+    for name in args.backends:
+        summary = run_backend(resolve_backend(name), goldens, args.repeat)
+        summaries[name] = summary
+        print_summary(name, summary)
+        if args.min_accuracy is None:
+            if summary['unexpected']:
+                print(f"FAIL: {name} differs from the golden files in {summary['unexpected']} "
+                      f"fields not listed in KNOWN_WRONG")
+                failed = True
+        elif summary['accuracy'] < args.min_accuracy:
+            print(f"FAIL: {name} accuracy below {args.min_accuracy:.2%}")
+            failed = True
+        if args.max_seconds is not None and summary['median_seconds_per_pdf'] > args.max_seconds:
+            print(f"FAIL: {name} slower than {args.max_seconds} s per PDF")
+            failed = True
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
+            f.write('\n')
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
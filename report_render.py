@@ -0,0 +1,227 @@
+import io
+import os
+import math
+import csv
+import json
+import html
+
+from price_records import PriceRecords
+
+# Formats render_report() can produce, by file extension
+REPORT_FORMATS = ['txt', 'csv', 'json', 'html']
+
+# Report columns per item type: {type: {section: [(heading, market field, text width)]}}.
+# Types without an entry use the 'default' layout.
+REPORT_LAYOUTS = {
+    'fish': {
+        'wholesale': [('Peliyagoda', 'peliyagoda_wholesale', 15),
+                      ('Negombo', 'negombo_wholesale', 15)],
+        'retail': [('Pettah', 'pettah_retail', 15),
+                   ('Negombo', 'negombo_retail', 15),
+                   ('Narahenpita', 'narahenpita_retail', 15)]
+    },
+    'rice': {
+        'wholesale': [('Pettah', 'pettah_wholesale', 15),
+                      ('Marandagahamula', 'marandagahamula_wholesale', 20)],
+        'retail': [('Pettah', 'pettah_retail', 15),
+                   ('Dambulla', 'dambulla_retail', 15),
+                   ('Narahenpita', 'narahenpita_retail', 15)]
+    },
+    'default': {
+        'wholesale': [('Pettah', 'pettah_wholesale', 15),
+                      ('Dambulla', 'dambulla_wholesale', 15)],
+        'retail': [('Pettah', 'pettah_retail', 15),
+                   ('Dambulla', 'dambulla_retail', 15),
+                   ('Narahenpita', 'narahenpita_retail', 15)]
+    }
+}
+
+SECTION_TITLES = {
+    'wholesale': "Wholesale Prices (Rs./kg):",
+    'retail': "Retail Prices (Rs./kg):"
+}
+
+def format_price(price):
+    """Format price to proper format"""
+    try:
+        if price is None or math.isnan(float(price)):
+            return 'N/A'
+        return f"{float(price):,.2f}"
+    except (ValueError, TypeError):
+        return 'N/A'
+
+def calc_change(today, yesterday):
+    """Calculate price change percentage"""
+    try:
+        if today is not None and yesterday is not None and yesterday != 0:
+            return ((today - yesterday) / yesterday) * 100
+        return None
+    except (ValueError, TypeError):
+        return None
+
+def format_change(change):
+    """Format price change percentage"""
+    try:
+        if change is None:
+            return ''
+        return f"({change:+.1f}%)" if abs(change) > 0 else ''
+    except (ValueError, TypeError):
+        return ''
+
+def market_label(market):
+    """'pettah_wholesale' -> 'Pettah wholesale'"""
+    return market.replace('_', ' ').capitalize()
+
+def price_value(price):
+    """Stored price as a float, or None when it is missing"""
+    try:
+        value = float(price) if price is not None else None
+    except (ValueError, TypeError):
+        return None
+    return None if value is None or math.isnan(value) else value
+
+def render_report(report_date, items_by_type, formats=('txt',), analytics=None):
+    """
+    Render one day's {type: items} into each requested format in a single pass.
+    items are item dicts as stored in row_data or PriceRecords.
+    analytics (see analytics.report_sections) adds the movers and spreads sections.
+    Returns {format: text}.
+    """
+    text = []
+    text.append(f"Price Report for {report_date}\n")
+    text.append("=" * 60 + "\n\n")
+
+    csv_buffer = io.StringIO()
+    csv_writer = csv.writer(csv_buffer, lineterminator='\n')
+    csv_writer.writerow(['date', 'type', 'item', 'section', 'market', 'price'])
+
+    json_types = []
+
+    page = [f"<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\">"
+            f"<title>Price Report for {html.escape(str(report_date))}</title></head>\n<body>\n"
+            f"<h1>Price Report for {html.escape(str(report_date))}</h1>\n"]
+
+    for item_type, items in (items_by_type or {}).items():
+        layout = REPORT_LAYOUTS.get(item_type, REPORT_LAYOUTS['default'])
+
+        text.append(f"\n{str(item_type).upper()}\n")
+        text.append("=" * 60 + "\n\n")
+        page.append(f"<h2>{html.escape(str(item_type).upper())}</h2>\n")
+        if isinstance(items, PriceRecords):
+            names = items.names
+            today = lambda market: items.column(market).tolist()
+        else:
+            names = [row['item'] for row in items]
+            today = lambda market: [row.get(market, {}).get('today') for row in items]
+        json_items = [{'item': item} for item in names]
+
+        for section_index, (section, columns) in enumerate(layout.items()):
+            if section_index:
+                text.append("\n\n")
+            text.append(SECTION_TITLES[section] + "\n")
+            text.append("-" * 80 + "\n")
+            text.append(f"{'Item':<25} " + ' '.join(f"{heading:>{width}}" for heading, _, width in columns) + "\n")
+            text.append("-" * 80 + "\n")
+
+            page.append(f"<h3>{html.escape(SECTION_TITLES[section])}</h3>\n<table>\n<tr><th>Item</th>")
+            page.extend(f"<th>{html.escape(heading)}</th>" for heading, _, _ in columns)
+            page.append("</tr>\n")
+
+            prices_by_market = [today(market) for _, market, _ in columns]
+            for position, (item, json_item) in enumerate(zip(names, json_items)):
+                cells = []
+                page.append(f"<tr><td>{html.escape(str(item))}</td>")
+                for (heading, market, width), prices in zip(columns, prices_by_market):
+                    price = prices[position]
+                    formatted = format_price(price)
+                    cells.append(f"{formatted:>{width}}")
+                    page.append(f"<td>{formatted}</td>")
+                    value = price_value(price)
+                    json_item[market] = value
+                    csv_writer.writerow([report_date, item_type, item, section, market,
+                                         '' if value is None else value])
+                text.append(f"{item:<25} " + ' '.join(cells) + "\n")
+                page.append("</tr>\n")
+            page.append("</table>\n")
+
+        text.append("\n" + "-" * 80 + "\n")
+        json_types.append({'type': item_type, 'items': json_items})
+
+    json_analytics = render_analytics(analytics, text, page) if analytics else None
+
+    text.append("\nNote: All prices are in Sri Lankan Rupees (Rs.)\n")
+    page.append("<p>Note: All prices are in Sri Lankan Rupees (Rs.)</p>\n</body>\n</html>\n")
+
+    rendered = {
+        'txt': lambda: ''.join(text),
+        'csv': csv_buffer.getvalue,
+        'json': lambda: json.dumps({'date': str(report_date), 'types': json_types,
+                                    **({'analytics': json_analytics} if analytics else {})},
+                                   indent=2) + '\n',
+        'html': lambda: ''.join(page)
+    }
+    return {report_format: rendered[report_format]() for report_format in formats}
+
+def render_analytics(analytics, text, page):
+    """Append the movers and spreads sections to the text and HTML buffers and return their JSON form"""
+    mover_heading = f"{'Item':<25} {'Market':<26} {'Yesterday':>12} {'Today':>12} {'Change':>10}\n"
+    mover_cells = ['Item', 'Market', 'Yesterday', 'Today', 'Change']
+    json_movers = {}
+
+    for key, title in (('movers_by_type', 'TOP MOVERS BY TYPE'), ('movers_by_market', 'TOP MOVERS BY MARKET')):
+        text.append(f"\n{title}\n")
+        text.append("=" * 60 + "\n")
+        page.append(f"<h2>{title}</h2>\n")
+        json_groups = json_movers.setdefault(key, {})
+        for group, rows in analytics[key]:
+            label = str(group).upper() if key == 'movers_by_type' else market_label(group)
+            text.append(f"\n{label}:\n")
+            text.append(mover_heading)
+            text.append("-" * 80 + "\n")
+            page.append(f"<h3>{html.escape(label)}</h3>\n<table>\n<tr>")
+            page.extend(f"<th>{cell}</th>" for cell in mover_cells)
+            page.append("</tr>\n")
+            for item, item_type, market, yesterday, today, change in rows:
+                cells = [str(item), market_label(market), format_price(yesterday),
+                         format_price(today), format_change(change)]
+                text.append(f"{cells[0]:<25} {cells[1]:<26} {cells[2]:>12} {cells[3]:>12} {cells[4]:>10}\n")
+                page.append('<tr>' + ''.join(f"<td>{html.escape(cell)}</td>" for cell in cells) + "</tr>\n")
+            page.append("</table>\n")
+            json_groups[str(group)] = [
+                {'item': item, 'type': item_type, 'market': market,
+                 'yesterday': yesterday, 'today': today, 'change': change}
+                for item, item_type, market, yesterday, today, change in rows
+            ]
+
+    text.append("\nMARKET SPREADS (%)\n")
+    text.append("=" * 60 + "\n")
+    text.append(f"{'Type':<12} {'Spread':<30} {'Mean':>9} {'Min':>9} {'Max':>9} {'Items':>6}\n")
+    text.append("-" * 80 + "\n")
+    page.append("<h2>MARKET SPREADS (%)</h2>\n<table>\n<tr>")
+    page.extend(f"<th>{cell}</th>" for cell in ('Type', 'Spread', 'Mean', 'Min', 'Max', 'Items'))
+    page.append("</tr>\n")
+    json_spreads = []
+    for item_type, label, mean, low, high, count in analytics['spreads']:
+        cells = [str(item_type), label, f"{mean:+.1f}", f"{low:+.1f}", f"{high:+.1f}", str(count)]
+        text.append(f"{cells[0]:<12} {cells[1]:<30} {cells[2]:>9} {cells[3]:>9} {cells[4]:>9} {cells[5]:>6}\n")
+        page.append('<tr>' + ''.join(f"<td>{html.escape(cell)}</td>" for cell in cells) + "</tr>\n")
+        json_spreads.append({'type': item_type, 'spread': label, 'mean': mean,
+                             'min': low, 'max': high, 'items': count})
+    page.append("</table>\n")
+    text.append("-" * 80 + "\n")
+
+    return {**json_movers, 'spreads': json_spreads}
+
+def write_reports(report_file, rendered):
+    """
+    Write each rendered format next to report_file (which names the text
+    report) with one write per file. Returns the paths written.
+    """
+    stem = os.path.splitext(report_file)[0]
+    paths = []
+    for report_format, content in rendered.items():
+        path = f"{stem}.{report_format}"
+        with open(path, 'w') as f:
+            f.write(content)
+        paths.append(path)
+    return paths
@@ -0,0 +1,56 @@
+# Sections of the price table in the order they appear on the page.
+# header_offset skips the marker row and the sub-header rows that follow it,
+# markets names the five yesterday/today column pairs of extract_prices().
+# The last section has no following marker, so it runs to the end of the
+# table and drops the trailing note rows instead.
+SECTIONS = [
+    {
+        'type': 'vegetables',
+        'marker': 'V E G',
+        'label': 'VEGETABLES',
+        'header_offset': 2,
+        'markets': ['pettah_wholesale', 'dambulla_wholesale', 'pettah_retail',
+                    'dambulla_retail', 'narahenpita_retail']
+    },
+    {
+        'type': 'other',
+        'marker': 'O T H E R',
+        'label': 'OTHER',
+        'header_offset': 2,
+        'markets': ['pettah_wholesale', 'dambulla_wholesale', 'pettah_retail',
+                    'dambulla_retail', 'narahenpita_retail']
+    },
+    {
+        'type': 'fruits',
+        'marker': 'F R U I T S',
+        'label': 'FRUITS',
+        'header_offset': 2,
+        'markets': ['pettah_wholesale', 'dambulla_wholesale', 'pettah_retail',
+                    'dambulla_retail', 'narahenpita_retail']
+    },
+    {
+        'type': 'rice',
+        'marker': 'R I C E',
+        'label': 'RICE',
+        'header_offset': 4,
+        'markets': ['pettah_wholesale', 'marandagahamula_wholesale', 'pettah_retail',
+                    'dambulla_retail', 'narahenpita_retail']
+    },
+    {
+        'type': 'fish',
+        'marker': 'F I S H',
+        'label': 'FISH',
+        'header_offset': 4,
+        'markets': ['peliyagoda_wholesale', 'negombo_wholesale', 'pettah_retail',
+                    'negombo_retail', 'narahenpita_retail']
+    }
+]
+
+# Type table of the PriceRecords built by pdf_extractor.process_table_data
+RECORD_TYPES = [(section['type'], section['markets']) for section in SECTIONS]
+
+# Every market field of the extracted items: the wholesale markets, then the
+# retail ones, each in order of first appearance in SECTIONS
+_ALL_MARKETS = list(dict.fromkeys(market for section in SECTIONS for market in section['markets']))
+MARKETS = ([market for market in _ALL_MARKETS if market.endswith('_wholesale')] +
+           [market for market in _ALL_MARKETS if not market.endswith('_wholesale')])
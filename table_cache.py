@@ -0,0 +1,85 @@
+import os
+import json
+import zlib
+import hashlib
+
+# Raw tables extracted by pdfplumber, keyed by PDF content and table settings
+CACHE_DIR = os.path.join('cache', 'tables')
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = '.tbl'
+
+def file_hash(path):
+    """SHA-256 of the file contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def settings_hash(settings):
+    """Stable hash of a JSON-serialisable settings dict"""
+    encoded = json.dumps(settings, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def cache_key(pdf_path, settings):
+    """Cache key for the table extracted from pdf_path with the given settings"""
+    return f"{file_hash(pdf_path)}-{settings_hash(settings)[:16]}"
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + ENTRY_SUFFIX)
+
+def load_table(key, cache_dir=CACHE_DIR):
+    """Return the cached table rows for key, or None on a miss"""
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, 'rb') as f:
+            payload = f.read()
+        table = json.loads(zlib.decompress(payload).decode('utf-8'))
+    except FileNotFoundError:
+        return None
+    except (OSError, zlib.error, ValueError) as e:
+        print(f"Ignoring unreadable cache entry {path}: {str(e)}")
+        return None
+
+    # Refresh the modification time so eviction keeps recently used entries
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return table
+
+def store_table(key, table, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Store the table rows for key and evict old entries beyond max_bytes"""
+    os.makedirs(cache_dir, exist_ok=True)
+    encoded = json.dumps(table, separators=(',', ':')).encode('utf-8')
+    payload = zlib.compress(encoded, 6)
+
+    # Write to a temporary file first so readers never see a partial entry
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+    evict(cache_dir, max_bytes)
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Remove least recently used entries until the cache fits in max_bytes"""
+    entries = []
+    total = 0
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(ENTRY_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
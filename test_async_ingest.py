@@ -0,0 +1,46 @@
+import asyncio
+
+from pymongo.errors import ServerSelectionTimeoutError
+
+import async_ingest
+import ingest_marker
+import pdf_extractor
+from conftest import AsyncRecordingCollection, documents
+
+def test_items_arriving_at_the_flush_deadline_are_kept(monkeypatch):
+    monkeypatch.setattr(pdf_extractor, 'UPDATE_PRICE_CUBE', False)
+    monkeypatch.setattr(ingest_marker, 'mark_ingested', lambda: None)
+    collection = AsyncRecordingCollection()
+
+    async def run():
+        write_queue = asyncio.Queue(async_ingest.QUEUE_SIZE)
+        move_queue = asyncio.Queue()
+        writer = asyncio.ensure_future(async_ingest.write(collection, write_queue, move_queue, 1, 100, 0.01))
+        # Every PDF lands right around the time the partial batch is due
+        for number in range(20):
+            await write_queue.put((f"{number}.pdf", documents()))
+            await asyncio.sleep(0.01)
+        await write_queue.put(async_ingest.DONE)
+        await writer
+
+        moved = []
+        while (pdf_path := move_queue.get_nowait()) is not async_ingest.DONE:
+            moved.append(pdf_path)
+        return moved
+
+    assert asyncio.run(run()) == [f"{number}.pdf" for number in range(20)]
+    assert collection.writes() == 20
+
+def test_failed_batch_is_returned_and_not_moved(monkeypatch):
+    monkeypatch.setattr(pdf_extractor, 'UPDATE_PRICE_CUBE', False)
+
+    async def run():
+        write_queue = asyncio.Queue()
+        move_queue = asyncio.Queue()
+        await write_queue.put(('a.pdf', documents()))
+        await write_queue.put(async_ingest.DONE)
+        collection = AsyncRecordingCollection(ServerSelectionTimeoutError('no server'))
+        failed = await async_ingest.write(collection, write_queue, move_queue, 1, 100, 5.0)
+        return failed, move_queue.get_nowait()
+
+    assert asyncio.run(run()) == (['a.pdf'], async_ingest.DONE)
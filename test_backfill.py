@@ -0,0 +1,67 @@
+from pymongo.errors import ServerSelectionTimeoutError
+
+import backfill
+import ingest_marker
+import pdf_extractor
+import price_cube
+from conftest import RecordingCollection, documents
+
+def fake_parse(pdf_paths, workers, use_cache):
+    for pdf_path in pdf_paths:
+        yield pdf_path, documents(pdf_extractor.date_from_filename(pdf_path))
+
+def run(tmp_path, monkeypatch, collection):
+    monkeypatch.setattr(pdf_extractor, 'iter_parsed_pdfs', fake_parse)
+    monkeypatch.setattr(pdf_extractor, 'UPDATE_PRICE_CUBE', False)
+    monkeypatch.setattr(ingest_marker, 'mark_ingested', lambda: None)
+    ledger_path = str(tmp_path / 'ledger.sqlite')
+    backfill.backfill(str(tmp_path / 'in'), collection=collection, ledger_path=ledger_path)
+    ledger = backfill.open_ledger(ledger_path)
+    try:
+        return dict(ledger.execute("SELECT path, status FROM files"))
+    finally:
+        ledger.close()
+
+def test_failed_write_marks_files_failed(tmp_path, monkeypatch):
+    (tmp_path / 'in').mkdir()
+    (tmp_path / 'in' / '2024-12-03.pdf').write_bytes(b'%PDF')
+    statuses = run(tmp_path, monkeypatch, RecordingCollection(ServerSelectionTimeoutError('no server')))
+    assert list(statuses.values()) == [backfill.FAILED]
+    assert (tmp_path / 'in' / '2024-12-03.pdf').exists()
+
+def test_reissued_pdf_is_ingested_again(tmp_path, monkeypatch):
+    (tmp_path / 'in').mkdir()
+    pdf_path = tmp_path / 'in' / '2024-12-03.pdf'
+    pdf_path.write_bytes(b'%PDF')
+    collection = RecordingCollection()
+    assert list(run(tmp_path, monkeypatch, collection).values()) == [backfill.MOVED]
+
+    pdf_path.write_bytes(b'%PDF reissued')
+    assert list(run(tmp_path, monkeypatch, collection).values()) == [backfill.MOVED]
+    assert collection.writes() == 2
+    assert not pdf_path.exists()
+    assert (tmp_path / 'in' / 'processed' / '2024-12-03.pdf').read_bytes() == b'%PDF reissued'
+
+def test_written_is_recorded_after_the_cube_append(tmp_path, monkeypatch):
+    (tmp_path / 'in').mkdir()
+    (tmp_path / 'in' / '2024-12-03.pdf').write_bytes(b'%PDF')
+
+    def crash(documents):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(price_cube, 'append_documents', crash)
+    monkeypatch.setattr(pdf_extractor, 'iter_parsed_pdfs', fake_parse)
+    monkeypatch.setattr(pdf_extractor, 'UPDATE_PRICE_CUBE', True)
+    ledger_path = str(tmp_path / 'ledger.sqlite')
+    try:
+        backfill.backfill(str(tmp_path / 'in'), collection=RecordingCollection(), ledger_path=ledger_path)
+        assert False, 'expected the cube append to fail'
+    except OSError:
+        pass
+
+    # The file is parsed and written again on resume, not just moved
+    ledger = backfill.open_ledger(ledger_path)
+    try:
+        assert list(ledger.execute("SELECT status FROM files")) == [(backfill.PARSED,)]
+    finally:
+        ledger.close()
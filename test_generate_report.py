@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import generate_report
+import migrate_price_buckets
+import price_records
+
+class Collection:
+    def __init__(self):
+        self.documents = {}
+        self.writes = 0
+
+    def find_one(self, query, projection=None):
+        if '_id' in query:
+            return self.documents.get(query['_id'])
+        return next((doc for doc in self.documents.values() if doc.get('item') == query['item']), None)
+
+    def find(self, query=None, projection=None):
+        query = query or {}
+        month = query.get('month')
+        ids = query.get('_id', {}).get('$in')
+        return [doc for doc in self.documents.values()
+                if (month is None or month['$gte'] <= doc.get('month', '') <= month['$lte']) and
+                (ids is None or doc['_id'] in ids)]
+
+    def update_one(self, query, update, upsert=False):
+        self.documents.setdefault(query['_id'], {'_id': query['_id']}).update(update['$set'])
+
+    def bulk_write(self, operations, ordered=True):
+        self.writes += len(operations)
+        return type('Result', (), {'matched_count': 0, 'modified_count': 0, 'upserted_count': len(operations)})()
+
+class Database(dict):
+    def __missing__(self, name):
+        collection = Collection()
+        self[name] = collection
+        return collection
+
+def report_doc():
+    item = {'type': 'vegetables', 'item': 'Beans',
+            'pettah_wholesale': {'yesterday': '750.0', 'today': '800.0'}}
+    return {'date': datetime(2024, 12, 3), 'data': [item]}
+
+def test_writers_and_readers_follow_the_stored_layout(monkeypatch):
+    monkeypatch.setattr(price_records, 'PRICE_VALUES', 'string')
+    database = Database()
+    database['vegetables_prices'].documents['Beans'] = {'item': 'Beans', 'type': 'vegetables',
+                                                        '20241202': {'retail': {}}}
+    assert generate_report.load_price_storage(database) == 'item'
+    generate_report.save_to_mongodb(report_doc(), database)
+    assert database['vegetables_prices'].writes == 1
+
+    # The migration switches the layout; no writer or reader needs a flag for it
+    migrate_price_buckets.migrate(database)
+    assert generate_report.load_price_storage(database) == 'monthly'
+    generate_report.save_to_mongodb(report_doc(), database)
+    assert database['vegetables_prices'].writes == 1
+    assert database['vegetables_prices_monthly'].writes == 3
+
+    database['vegetables_prices_monthly'].documents['Beans'] = {'item': 'Beans', 'month': '202412',
+                                                                'days': {'20241202': {'retail': {}}}}
+    history = generate_report.load_price_history('vegetables', 'Beans', datetime(2024, 12, 1),
+                                                 datetime(2024, 12, 31), database)
+    assert history == [('20241202', {'retail': {}})]
+
+def test_incremental_runs_follow_the_report_settings(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(generate_report, 'REPORT_OUTPUTS', ['txt'])
+    database = Database()
+    date = datetime(2024, 12, 3)
+    database['row_data'].documents['a'] = {'_id': 'a', 'date': date, 'content_hash': 'h'}
+    fingerprints = generate_report.source_fingerprints(database, generate_report.report_settings(database))
+
+    # What a full run records once it wrote the text report
+    (tmp_path / 'reports').mkdir()
+    (tmp_path / 'reports' / 'price_report_2024-12-03.txt').write_text('report')
+    database['report_fingerprints'].documents[date] = {'_id': date, 'fingerprint': fingerprints[date]}
+    assert generate_report.changed_dates(database, fingerprints) == {}
+
+    # Asking for CSV as well needs the date rendered again
+    monkeypatch.setattr(generate_report, 'REPORT_OUTPUTS', ['txt', 'csv'])
+    fingerprints = generate_report.source_fingerprints(database, generate_report.report_settings(database))
+    assert list(generate_report.changed_dates(database, fingerprints)) == [date]
@@ -0,0 +1,48 @@
+import time
+
+from pymongo.errors import ServerSelectionTimeoutError
+
+import ingest_marker
+import pdf_extractor
+from conftest import RecordingCollection, documents
+
+def setup(monkeypatch, moved):
+    monkeypatch.setattr(pdf_extractor, 'UPDATE_PRICE_CUBE', False)
+    monkeypatch.setattr(ingest_marker, 'mark_ingested', lambda: None)
+    monkeypatch.setattr(pdf_extractor, 'move_to_processed', moved.append)
+
+def test_partial_batch_flushes_while_parser_is_busy(monkeypatch):
+    moved = []
+    setup(monkeypatch, moved)
+    collection = RecordingCollection()
+
+    def slow_parser():
+        yield 'a.pdf', documents()
+        time.sleep(0.5)
+        yield 'b.pdf', documents()
+
+    start = time.monotonic()
+    failed = pdf_extractor.write_parsed_pdfs(slow_parser(), batch_size=100, flush_interval=0.1,
+                                             target_collection=collection)
+    assert failed == []
+    assert moved == ['a.pdf', 'b.pdf']
+    assert len(collection.batches) == 2
+    # The first batch went out on the timer, not when b.pdf arrived
+    assert collection.batches[0][0] - start < 0.4
+
+def test_failed_batch_is_not_moved(monkeypatch):
+    moved = []
+    setup(monkeypatch, moved)
+    collection = RecordingCollection(ServerSelectionTimeoutError('no server'))
+    parsed = [('a.pdf', documents()), ('b.pdf', documents())]
+    failed = pdf_extractor.write_parsed_pdfs(iter(parsed), target_collection=collection)
+    assert failed == ['a.pdf', 'b.pdf']
+    assert moved == []
+
+def test_unacknowledged_batch_is_not_moved(monkeypatch):
+    moved = []
+    setup(monkeypatch, moved)
+    collection = RecordingCollection(acknowledged=False)
+    failed = pdf_extractor.write_parsed_pdfs(iter([('a.pdf', documents())]), target_collection=collection)
+    assert failed == ['a.pdf']
+    assert moved == []
@@ -0,0 +1,24 @@
+import pdfplumber
+
+import page_locator
+
+PDFS = ['data/processed/2024-12-03.pdf', 'data/processed/2024-12-04.pdf']
+
+def locate(pdf_path, locations_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return page_locator.locate_table_page(pdf, locations_path), page_locator.layout_key(pdf)
+
+def test_one_location_per_layout(tmp_path):
+    locations_path = str(tmp_path / 'page_locations.json')
+    results = [locate(pdf_path, locations_path) for pdf_path in PDFS]
+    assert [index for index, _ in results] == [1, 1]
+    assert page_locator.load_locations(locations_path) == {layout: 1 for _, layout in results}
+
+def test_wrong_stored_location_is_corrected(tmp_path):
+    locations_path = str(tmp_path / 'page_locations.json')
+    with pdfplumber.open(PDFS[0]) as pdf:
+        layout = page_locator.layout_key(pdf)
+    page_locator.save_location(layout, 0, locations_path)
+
+    assert locate(PDFS[0], locations_path)[0] == 1
+    assert page_locator.load_locations(locations_path)[layout] == 1
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import price_cube
+
+def document(day, beans, carrot=None):
+    items = [{'type': 'vegetables', 'item': 'Beans',
+              'pettah_wholesale': {'yesterday': 'N/A', 'today': str(beans)}}]
+    if carrot is not None:
+        items.append({'type': 'vegetables', 'item': 'Carrot',
+                      'pettah_wholesale': {'yesterday': 'N/A', 'today': str(carrot)}})
+    return {'date': datetime(2024, 12, day), 'data': items}
+
+def beans(cube_dir):
+    dates, values = price_cube.item_series('vegetables', 'Beans', 'pettah_wholesale', cube_dir=str(cube_dir))
+    return dict(zip(dates, values.tolist()))
+
+def test_appends_backfills_and_reingests_in_date_order(tmp_path):
+    price_cube.append_documents([document(5, 500.0)], str(tmp_path))
+    price_cube.append_documents([document(6, 600.0)], str(tmp_path))
+    # Back-filled dates arrive newest first and bring a new item
+    price_cube.append_documents([document(3, 300.0, carrot=30.0), document(1, 100.0)], str(tmp_path))
+    price_cube.append_documents([document(5, 550.0)], str(tmp_path))
+
+    assert beans(tmp_path) == {'2024-12-01': 100.0, '2024-12-03': 300.0,
+                               '2024-12-05': 550.0, '2024-12-06': 600.0}
+    dates, carrot = price_cube.item_series('vegetables', 'Carrot', 'pettah_wholesale', cube_dir=str(tmp_path))
+    assert np.isnan(carrot[dates.index('2024-12-05')])
+    assert carrot[dates.index('2024-12-03')] == 30.0
+    # Only the data file named by the index is kept
+    assert sorted(name for name in tmp_path.iterdir() if name.suffix == '.bin') == \
+        [tmp_path / price_cube.load_index(str(tmp_path))['data_file']]
+
+@pytest.mark.parametrize('day', [7, 4])
+def test_interrupted_append_leaves_previous_cube(tmp_path, monkeypatch, day):
+    price_cube.append_documents([document(5, 500.0), document(6, 600.0)], str(tmp_path))
+
+    def crash(index, cube_dir):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(price_cube, '_save_index', crash)
+    with pytest.raises(KeyboardInterrupt):
+        price_cube.append_documents([document(day, 700.0)], str(tmp_path))
+
+    assert beans(tmp_path) == {'2024-12-05': 500.0, '2024-12-06': 600.0}
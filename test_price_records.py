@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import numpy as np
+
+import pdf_extractor
+import price_records
+from price_records import PriceRecords
+
+class Settings:
+    def __init__(self):
+        self.documents = {}
+
+    def find_one(self, query):
+        return self.documents.get(query['_id'])
+
+    def update_one(self, query, update, upsert=False):
+        self.documents.setdefault(query['_id'], {'_id': query['_id']}).update(update['$set'])
+
+def test_writers_follow_the_stored_price_mode(monkeypatch):
+    monkeypatch.setattr(price_records, 'PRICE_VALUES', 'string')
+    database = {price_records.SETTINGS_COLLECTION: Settings()}
+    records = PriceRecords(pdf_extractor.RECORD_TYPES, [0], ['Beans'],
+                           np.array([[750.0, 800.0, np.nan, 525.0, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan]]))
+    document = {'date': datetime(2024, 12, 3), 'type': 'vegetables', 'table_index': 0, 'data': records}
+
+    assert price_records.load_price_values(database) == 'string'
+    assert pdf_extractor.storage_document(document)['data'][0]['pettah_wholesale']['today'] == '800.0'
+
+    # What migrate_numeric_prices.py records; a later writer picks it up without any flag
+    price_records.store_price_values(database, 'number')
+    assert price_records.load_price_values(database) == 'number'
+    item = pdf_extractor.storage_document(document)['data'][0]
+    assert item['pettah_wholesale']['today'] == 800.0
+    assert item['dambulla_wholesale']['yesterday'] is None
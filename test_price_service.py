@@ -0,0 +1,48 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+from pymongo.errors import ServerSelectionTimeoutError
+
+import ingest_marker
+import price_service
+
+def test_response_built_across_an_ingest_is_not_cached(tmp_path):
+    marker = str(tmp_path / 'ingest_generation')
+    ingest_marker.mark_ingested(marker)
+    cache = price_service.ResponseCache(marker=marker)
+
+    body, generation = cache.get('/prices/latest')
+    assert body is None
+    # An ingest lands while the response is being built from Mongo
+    ingest_marker.mark_ingested(marker)
+    cache.put('/prices/latest', b'stale', generation)
+    assert cache.get('/prices/latest')[0] is None
+
+    body, generation = cache.get('/prices/latest')
+    cache.put('/prices/latest', b'fresh', generation)
+    assert cache.get('/prices/latest')[0] == b'fresh'
+
+class UnreachableRowData:
+    def find_one(self, *args, **kwargs):
+        raise ServerSelectionTimeoutError('no server')
+
+def test_database_errors_return_json_500(tmp_path):
+    price_service.PriceHandler.cache = price_service.ResponseCache(marker=str(tmp_path / 'marker'))
+    price_service.PriceHandler.row_data = UnreachableRowData()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), price_service.PriceHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/prices/latest"
+        try:
+            urllib.request.urlopen(url, timeout=5)
+            assert False, 'expected an HTTP error'
+        except urllib.error.HTTPError as e:
+            assert e.code == 500
+            assert json.loads(e.read()) == {'error': 'internal error'}
+    finally:
+        server.shutdown()
+        server.server_close()
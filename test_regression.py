@@ -0,0 +1,17 @@
+import page_locator
+import regression
+
+def test_extractor_matches_golden_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(page_locator, 'LOCATIONS_PATH', str(tmp_path / 'page_locations.json'))
+    summary = regression.run_backend(regression.BACKENDS['extract'], regression.load_golden(), repeat=1)
+    # 42 items x 5 report columns x yesterday/today, in each of the three PDFs
+    assert summary['fields'] == 3 * 420
+    assert summary['unexpected'] == 0
+    assert summary['correct'] == summary['fields'] - sum(len(fields) for fields in regression.KNOWN_WRONG.values())
+
+def test_update_keeps_verified_golden_files(tmp_path):
+    golden = tmp_path / '2024-12-03.json'
+    golden.write_text('verified')
+    assert regression.build_golden(golden_dir=str(tmp_path)) == [
+        str(tmp_path / '2024-12-04.json'), str(tmp_path / '2024-12-05.json')]
+    assert golden.read_text() == 'verified'
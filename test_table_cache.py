@@ -0,0 +1,19 @@
+import pdf_extractor
+import page_locator
+import table_cache
+
+PDF = 'data/processed/2024-12-03.pdf'
+
+def test_store_and_load(tmp_path):
+    key = table_cache.cache_key(PDF, pdf_extractor.extraction_settings())
+    assert table_cache.load_table(key, str(tmp_path)) is None
+    table_cache.store_table(key, {'page': 2, 'rows': [['Beans', '800.00']]}, str(tmp_path))
+    assert table_cache.load_table(key, str(tmp_path)) == {'page': 2, 'rows': [['Beans', '800.00']]}
+
+def test_key_follows_extraction_settings(monkeypatch):
+    key = table_cache.cache_key(PDF, pdf_extractor.extraction_settings())
+    monkeypatch.setitem(pdf_extractor.TABLE_SETTINGS, 'snap_y_tolerance', 4)
+    settings_key = table_cache.cache_key(PDF, pdf_extractor.extraction_settings())
+    monkeypatch.setattr(page_locator, 'HEADER_BAND', 0.5)
+    locator_key = table_cache.cache_key(PDF, pdf_extractor.extraction_settings())
+    assert len({key, settings_key, locator_key}) == 3
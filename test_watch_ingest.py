@@ -0,0 +1,30 @@
+from pymongo.errors import ServerSelectionTimeoutError
+
+import pdf_extractor
+import price_records
+import watch_ingest
+
+def test_open_files_do_not_make_the_loop_spin():
+    # An idle file still open by its writer is long past the debounce
+    pending = {'open.pdf': (0.0, 100, False)}
+    assert watch_ingest.next_timeout(pending, 2.0, 100.0) is None
+
+    pending['closed.pdf'] = (99.0, 100, True)
+    assert watch_ingest.next_timeout(pending, 2.0, 100.0) == 1.0
+
+def test_ingest_survives_database_errors(monkeypatch, tmp_path):
+    pdf_path = tmp_path / '2024-12-03.pdf'
+    pdf_path.write_bytes(b'%PDF')
+
+    def unreachable(parsed_pdfs, *args, **kwargs):
+        raise ServerSelectionTimeoutError('no server')
+
+    monkeypatch.setattr(watch_ingest, 'get_db', lambda: None)
+    monkeypatch.setattr(price_records, 'load_price_values', lambda database: 'string')
+    monkeypatch.setattr(pdf_extractor, 'iter_parsed_pdfs', lambda paths, workers, use_cache: iter([]))
+    monkeypatch.setattr(pdf_extractor, 'write_parsed_pdfs', unreachable)
+    assert watch_ingest.ingest([str(pdf_path)]) == [str(pdf_path)]
+
+    # Reading the stored price mode is the first database call
+    monkeypatch.setattr(price_records, 'load_price_values', unreachable)
+    assert watch_ingest.ingest([str(pdf_path)]) == [str(pdf_path)]
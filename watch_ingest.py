@@ -0,0 +1,180 @@
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import argparse
+
+import pdf_extractor
+import price_records
+from mongo import get_db
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+EVENT_HEADER = struct.Struct('iIII')
+
+# Seconds a PDF must stay untouched (no new events, same size) before it is ingested
+DEBOUNCE_SECONDS = 2.0
+
+# Seconds before PDFs whose ingest failed (e.g. Mongo unreachable) are tried again
+RETRY_SECONDS = 30.0
+
+def open_watch(pdf_dir):
+    """Create a non-blocking inotify descriptor watching pdf_dir"""
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+    wd = libc.inotify_add_watch(fd, os.fsencode(pdf_dir), WATCH_MASK)
+    if wd < 0:
+        err = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(err, f"inotify_add_watch failed for {pdf_dir}: {os.strerror(err)}")
+    return fd
+
+def read_events(fd):
+    """Read the pending events and return (mask, filename) pairs"""
+    try:
+        data = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return []
+
+    events = []
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        _, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        name = data[offset:offset + name_len].rstrip(b'\0').decode('utf-8', 'replace')
+        offset += name_len
+        events.append((mask, name))
+    return events
+
+def ingest(pdf_paths, use_cache=True):
+    """
+    Parse the ready PDFs, store them and move them to the processed folder.
+    Returns the paths that could not be stored. Errors are logged instead of
+    raised, so a database outage does not stop the daemon. The stored price
+    mode is read again every time, so a migration takes effect without a restart.
+    """
+    try:
+        price_records.load_price_values(get_db())
+        parsed_pdfs = pdf_extractor.iter_parsed_pdfs(pdf_paths, 1, use_cache)
+        return pdf_extractor.write_parsed_pdfs(parsed_pdfs)
+    except Exception as e:
+        print(f"Ingest of {len(pdf_paths)} PDFs failed: {str(e)}")
+        return [pdf_path for pdf_path in pdf_paths if os.path.exists(pdf_path)]
+
+def next_timeout(pending, debounce, now):
+    """
+    Seconds until the next closed PDF is due, or None to wait for events.
+    Files still open by their writer only become due after their close event.
+    """
+    due = [last_event + debounce for last_event, _, closed in pending.values() if closed]
+    if not due:
+        return None
+    return max(0.0, min(due) - now)
+
+def watch(pdf_dir='data', debounce=DEBOUNCE_SECONDS, use_cache=True):
+    """
+    Ingest PDFs as they land in pdf_dir.
+    A file is ingested once its writer has closed it (or it was moved in),
+    it has had no events for `debounce` seconds and its size has stopped
+    changing, so partially written files are skipped.
+    """
+    os.makedirs(os.path.join(pdf_dir, 'processed'), exist_ok=True)
+    fd = open_watch(pdf_dir)
+
+    # name -> (time of last event, size seen at that time, closed by its writer)
+    pending = {}
+
+    def touch(name, closed, delay=0.0):
+        path = os.path.join(pdf_dir, name)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            pending.pop(name, None)
+            return
+        pending[name] = (time.monotonic() + delay, size, closed)
+
+    # PDFs that arrived while the daemon was down are picked up once at startup
+    for filename in pdf_extractor.find_pdf_files(pdf_dir):
+        touch(filename, True)
+
+    print(f"Watching {pdf_dir} for new PDFs...")
+    try:
+        while True:
+            timeout = next_timeout(pending, debounce, time.monotonic())
+
+            try:
+                readable, _, _ = select.select([fd], [], [], timeout)
+            except InterruptedError:
+                continue
+
+            if readable:
+                for mask, name in read_events(fd):
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were dropped; fall back to a single listing
+                        print("inotify queue overflowed, re-listing directory")
+                        for filename in pdf_extractor.find_pdf_files(pdf_dir):
+                            touch(filename, True)
+                    elif not name.endswith('.pdf'):
+                        continue
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        pending.pop(name, None)
+                    else:
+                        touch(name, bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO)))
+
+            ready = []
+            now = time.monotonic()
+            for name, (last_event, size, closed) in list(pending.items()):
+                if not closed or now - last_event < debounce:
+                    continue
+                path = os.path.join(pdf_dir, name)
+                try:
+                    current_size = os.path.getsize(path)
+                except FileNotFoundError:
+                    del pending[name]
+                    continue
+                if current_size != size:
+                    # Still being written without generating events we saw
+                    touch(name, closed)
+                    continue
+                del pending[name]
+                ready.append(path)
+
+            if ready:
+                failed_paths = ingest(sorted(ready), use_cache)
+                if failed_paths:
+                    print(f"Retrying {len(failed_paths)} PDFs in {RETRY_SECONDS:.0f} seconds")
+                for pdf_path in failed_paths:
+                    # Dated into the future so they come due again after RETRY_SECONDS
+                    touch(os.path.basename(pdf_path), True, RETRY_SECONDS)
+    finally:
+        os.close(fd)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ingest price PDFs as they are written to a directory')
+    parser.add_argument('directory', nargs='?', default='data',
+                        help='directory to watch (default: data)')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                        help=f'seconds a file must be idle before ingesting (default: {DEBOUNCE_SECONDS})')
+    parser.add_argument('--no-table-cache', action='store_true',
+                        help='always re-run table extraction instead of using cached tables')
+    args = parser.parse_args()
+    try:
+        watch(args.directory, args.debounce, use_cache=not args.no_table_cache)
+    except KeyboardInterrupt:
+        print("Stopped watching")